@@ -3,11 +3,67 @@
 
 import sys
 import os
+import re
+import operator
 sys.path.insert(0, os.path.dirname(__file__))
 
 from whatsapp_exporter.core import WhatsAppExporter
 from datetime import datetime, timedelta
-from collections import Counter
+from collections import Counter, defaultdict, namedtuple
+from bisect import bisect_left
+
+# Lightweight record for debug entries - much cheaper than a dict per detection
+Detail = namedtuple('Detail', 'source emoji mood date')
+
+# Extracts every person:emoji pair of a group reaction like AB:😂;CD:😍
+_GROUP_RX = re.compile(r'([^;:]+):([^;]+)')
+
+
+def _extract_mood_details(msg, mood_cats, mood_keys):
+    """Extract every mood detection (reactions and content emojis) for one message."""
+    details = []
+    msg_date_prefix = msg.get('date', '')[:10]
+
+    # 1. Process reaction emojis
+    reaction_text = msg.get('reaction_emoji')
+    if reaction_text:
+        # Handle group reactions format [AB:😂;CD:😍] or multiple reactions
+        if reaction_text[:1] == '[' and reaction_text[-1:] == ']':
+            reaction_content = reaction_text[1:-1]  # Remove brackets
+
+            # Group reactions - one compiled regex pass pulls out every
+            # person:emoji pair instead of split(';') + split(':') per item
+            group_matches = _GROUP_RX.findall(reaction_content)
+            if group_matches:
+                for person, emoji in group_matches:
+                    mood = mood_cats.get(emoji, 'unknown')
+                    if mood != 'unknown':
+                        details.append(Detail('reaction', emoji, mood, msg_date_prefix))
+            else:
+                # Simple reaction in brackets [😂] - just extract the emoji
+                emoji = reaction_content
+                mood = mood_cats.get(emoji, 'unknown')
+                if mood != 'unknown':
+                    details.append(Detail('reaction', emoji, mood, msg_date_prefix))
+        else:
+            # Individual reaction without brackets
+            emoji = reaction_text.strip()
+            mood = mood_cats.get(emoji, 'unknown')
+            if mood != 'unknown':
+                details.append(Detail('reaction', emoji, mood, msg_date_prefix))
+
+    # 2. Process emojis from message content
+    content = msg.get('content')
+    # Pure-ASCII content cannot contain emojis, and isascii() is a cheap
+    # C-level flag check, so most plain-text messages skip the scan entirely
+    if content and not content.isascii():
+        # Scan characters directly against the known mood emojis
+        # instead of running the emoji regex on every message
+        for char in content:
+            if char in mood_keys:
+                details.append(Detail('content', char, mood_cats[char], msg_date_prefix))
+
+    return details
 
 def analyze_mood_timeline(contact_name, weeks_to_analyze=5):
     """Analyze mood timeline generation in detail."""
@@ -38,15 +94,20 @@ def analyze_mood_timeline(contact_name, weeks_to_analyze=5):
         print(f"   Example reactions: {messages_with_reactions[:3]}")
     
     # Filter messages from 2023
-    messages_2023 = [m for m in messages if m.get('date', '').startswith('2023')]
+    messages_2023 = [m for m in messages if m.get('date', '')[:4] == '2023']
     print(f"📅 Messages in 2023: {len(messages_2023)}")
-    
+
     if not messages_2023:
         print("❌ No messages found in 2023")
         return
-    
+
+    # Parse each date once up front (fromisoformat is much faster than strptime)
+    # and reuse the datetime in the per-week filters below
+    for m in messages_2023:
+        m['_dt'] = datetime.fromisoformat(m['date'])
+
     # Get first message date
-    first_date = datetime.strptime(messages_2023[0]['date'], '%Y-%m-%d %H:%M:%S')
+    first_date = messages_2023[0]['_dt']
     print(f"📅 First message: {first_date}")
     
     # Find the Monday of the first week at MIDNIGHT (not at the message time!)
@@ -70,161 +131,125 @@ def analyze_mood_timeline(contact_name, weeks_to_analyze=5):
         print(f"\n   First 3 characters: {mood_analysis['weekly_timeline'][0][6:9] if mood_analysis['weekly_timeline'] else 'N/A'}")
     print(f"{'='*80}\n")
     
+    # Known mood-emoji characters, for O(1) membership tests on message content.
+    # Bind the analyzer's lookup tables to locals once so the hot loops avoid
+    # repeated attribute lookups.
+    mood_cats = mood_analyzer.mood_categories
+    mood_keys = frozenset(mood_cats)
+    mood_emojis_map = mood_analyzer.mood_emojis
+
+    # Extract mood detections in a single pass, so the per-week loop below is
+    # a pure counting loop over precomputed records
+    for m in messages_2023:
+        m['_details'] = _extract_mood_details(m, mood_cats, mood_keys)
+
+    # Messages arrive sorted by date, so each week is a contiguous slice;
+    # binary-search the week boundaries once instead of hashing every message
+    # into per-week buckets
+    parsed_dates = [m['_dt'] for m in messages_2023]
+    week_bounds = [bisect_left(parsed_dates, start_monday + timedelta(weeks=w))
+                   for w in range(weeks_to_analyze + 1)]
+
     # Analyze first N weeks
     for week_num in range(weeks_to_analyze):
         week_start = start_monday + timedelta(weeks=week_num)
         week_end = week_start + timedelta(days=7)
-        
-        print(f"\n{'='*80}")
-        print(f"WEEK {week_num + 1}: {week_start.date()} to {week_end.date()}")
-        print(f"{'='*80}")
-        
+
+        # Collect the week's report and emit it with a single stdout write,
+        # instead of one locked/flushed print call per line
+        out = []
+        out.append(f"\n{'='*80}")
+        out.append(f"WEEK {week_num + 1}: {week_start.date()} to {week_end.date()}")
+        out.append(f"{'='*80}")
+
         # Get messages for this week
-        week_messages = [
-            m for m in messages_2023
-            if week_start <= datetime.strptime(m['date'], '%Y-%m-%d %H:%M:%S') < week_end
-        ]
-        
-        print(f"📨 Messages in this week: {len(week_messages)}")
-        
+        week_messages = messages_2023[week_bounds[week_num]:week_bounds[week_num + 1]]
+
+        out.append(f"📨 Messages in this week: {len(week_messages)}")
+
         if not week_messages:
-            print("❌ No messages in this week → Timeline char: '　' (space)")
+            out.append("❌ No messages in this week → Timeline char: '　' (space)")
+            sys.stdout.write('\n'.join(out) + '\n')
             continue
         
         # Count MOODS from reactions AND content (following mood_analyzer logic exactly)
+        # Source and per-mood emoji tallies are accumulated during the same pass
+        # so the display section below never has to rescan reaction_details
         mood_counter = Counter()
+        source_counts = Counter()
+        mood_emoji_counts = defaultdict(Counter)
         reaction_details = []  # Store details for debugging
         
         for msg in week_messages:
-            # 1. Process reaction emojis
-            if msg.get('reaction_emoji'):
-                reaction_text = msg['reaction_emoji']
-                
-                # DEBUG: Check for specific message
-                if '🥰' in reaction_text:
-                    print(f"   🔍 DEBUG: Found message with 🥰 reaction")
-                    print(f"      Date: {msg.get('date')}")
-                    print(f"      Reaction text: {repr(reaction_text)}")
-                
-                # Handle group reactions format [AB:😂;CD:😍] or multiple reactions
-                if reaction_text.startswith('[') and reaction_text.endswith(']'):
-                    reaction_content = reaction_text[1:-1]  # Remove brackets
-                    
-                    # Check if it's a group reaction (contains :)
-                    if ':' in reaction_content:
-                        # Group reactions - parse each individual reaction
-                        individual_reactions = reaction_content.split(';')
-                        
-                        for reaction_item in individual_reactions:
-                            if ':' in reaction_item:
-                                person, emoji = reaction_item.split(':', 1)
-                                mood = mood_analyzer.mood_categories.get(emoji, 'unknown')
-                                if mood != 'unknown':
-                                    mood_counter[mood] += 1
-                                    reaction_details.append({
-                                        'source': 'reaction',
-                                        'emoji': emoji,
-                                        'mood': mood,
-                                        'date': msg.get('date', '')[:10]
-                                    })
-                    else:
-                        # Simple reaction in brackets [😂] - just extract the emoji
-                        emoji = reaction_content
-                        mood = mood_analyzer.mood_categories.get(emoji, 'unknown')
-                        if mood != 'unknown':
-                            mood_counter[mood] += 1
-                            reaction_details.append({
-                                'source': 'reaction',
-                                'emoji': emoji,
-                                'mood': mood,
-                                'date': msg.get('date', '')[:10]
-                            })
-                else:
-                    # Individual reaction without brackets
-                    emoji = reaction_text.strip()
-                    mood = mood_analyzer.mood_categories.get(emoji, 'unknown')
-                    if mood != 'unknown':
-                        mood_counter[mood] += 1
-                        reaction_details.append({
-                            'source': 'reaction',
-                            'emoji': emoji,
-                            'mood': mood,
-                            'date': msg.get('date', '')[:10]
-                        })
-            
-            # 2. Process emojis from message content
-            if msg.get('content'):
-                content = msg['content']
-                # Use mood_analyzer's emoji pattern
-                content_emojis = mood_analyzer.emoji_pattern.findall(content)
-                for emoji_group in content_emojis:
-                    # Extract individual emojis from each match
-                    for char in emoji_group:
-                        if char in mood_analyzer.mood_categories:
-                            mood = mood_analyzer.mood_categories[char]
-                            mood_counter[mood] += 1
-                            reaction_details.append({
-                                'source': 'content',
-                                'emoji': char,
-                                'mood': mood,
-                                'date': msg.get('date', '')[:10]
-                            })
+            reaction_text = msg.get('reaction_emoji')
+
+            # DEBUG: Check for specific message
+            if reaction_text and '🥰' in reaction_text:
+                out.append(f"   🔍 DEBUG: Found message with 🥰 reaction")
+                out.append(f"      Date: {msg.get('date')}")
+                out.append(f"      Reaction text: {repr(reaction_text)}")
+
+            for detail in msg['_details']:
+                mood_counter[detail.mood] += 1
+                source_counts[detail.source] += 1
+                mood_emoji_counts[detail.mood][detail.emoji] += 1
+            reaction_details.extend(msg['_details'])
         
         total_mood_entries = len(reaction_details)
-        from_reactions = len([r for r in reaction_details if r['source'] == 'reaction'])
-        from_content = len([r for r in reaction_details if r['source'] == 'content'])
+        from_reactions = source_counts['reaction']
+        from_content = source_counts['content']
         
-        print(f"💬 Mood entries: {total_mood_entries} total ({from_reactions} from reactions, {from_content} from content)")
+        out.append(f"💬 Mood entries: {total_mood_entries} total ({from_reactions} from reactions, {from_content} from content)")
         
         # DEBUG: Check for 🥰 specifically
-        smiling_face_with_hearts = [r for r in reaction_details if r['emoji'] == '🥰']
+        smiling_face_with_hearts = [r for r in reaction_details if r.emoji == '🥰']
         if smiling_face_with_hearts:
-            print(f"   🔍 DEBUG: Found {len(smiling_face_with_hearts)} instances of 🥰")
+            out.append(f"   🔍 DEBUG: Found {len(smiling_face_with_hearts)} instances of 🥰")
             for r in smiling_face_with_hearts:
-                print(f"      → {r}")
+                out.append(f"      → {r}")
         
-        print(f"\n� Mood categories with ALL emojis (from both sources):")
+        out.append(f"\n� Mood categories with ALL emojis (from both sources):")
         if mood_counter:
             for mood, count in mood_counter.most_common(20):
-                # Find ALL emojis that contributed to this mood
-                contributing = [r for r in reaction_details if r['mood'] == mood]
-                emoji_counts = Counter([r['emoji'] for r in contributing])
+                # ALL emojis that contributed to this mood, tallied during the main loop
+                emoji_counts = mood_emoji_counts[mood]
                 
                 # Show the mood category and its representative emoji
-                representative = mood_analyzer.mood_emojis.get(mood, '📝')
-                print(f"\n   {mood} → {representative} : {count} total")
+                representative = mood_emojis_map.get(mood, '📝')
+                out.append(f"\n   {mood} → {representative} : {count} total")
                 
                 # List ALL individual emojis with their counts
                 for emoji, emoji_count in emoji_counts.most_common():
                     # Show the actual emojis repeated (like you requested)
                     emoji_list = emoji * emoji_count
-                    print(f"      {emoji}: {emoji_count} → {emoji_list}")
+                    out.append(f"      {emoji}: {emoji_count} → {emoji_list}")
         else:
-            print("   (no moods found)")
+            out.append("   (no moods found)")
         
         # Determine dominant mood (using mood_analyzer logic)
         if mood_counter:
             # Remove 'unknown' moods if there are known moods
-            known_moods = {m: c for m, c in mood_counter.items() if m != 'unknown'}
-            if known_moods:
-                mood_counter = Counter(known_moods)
-            
-            most_common = mood_counter.most_common(1)[0]
-            dominant_mood = most_common[0]
-            dominant_count = most_common[1]
+            if len(mood_counter) > 1:
+                mood_counter.pop('unknown', None)
+
+
+            # Only the argmax is needed - a single max scan beats most_common's sort
+            dominant_mood, dominant_count = max(mood_counter.items(), key=operator.itemgetter(1))
             total_moods = sum(mood_counter.values())
             
             # Get representative emoji for this mood
-            representative_emoji = mood_analyzer.mood_emojis.get(dominant_mood, '📝')
+            representative_emoji = mood_emojis_map.get(dominant_mood, '📝')
             
-            print(f"\n🎯 Dominant mood: {dominant_mood} ({dominant_count}/{total_moods} = {dominant_count/total_moods*100:.1f}%)")
-            print(f"✅ Timeline character: {representative_emoji} (representative of '{dominant_mood}')")
+            out.append(f"\n🎯 Dominant mood: {dominant_mood} ({dominant_count}/{total_moods} = {dominant_count/total_moods*100:.1f}%)")
+            out.append(f"✅ Timeline character: {representative_emoji} (representative of '{dominant_mood}')")
         elif len(week_messages) > 0:
-            print(f"\n❌ No moods found (but {len(week_messages)} messages)")
-            print(f"✅ Timeline character: ＿ (underscore for messages without moods)")
+            out.append(f"\n❌ No moods found (but {len(week_messages)} messages)")
+            out.append(f"✅ Timeline character: ＿ (underscore for messages without moods)")
         else:
-            print(f"\n❌ No activity")
-            print(f"✅ Timeline character: 　 (space for no activity)")
+            out.append(f"\n❌ No activity")
+            out.append(f"✅ Timeline character: 　 (space for no activity)")
+
+        sys.stdout.write('\n'.join(out) + '\n')
 
 if __name__ == '__main__':
     analyze_mood_timeline("Laure", weeks_to_analyze=5)
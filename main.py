@@ -17,9 +17,23 @@ Date: September 2025
 import sys
 import os
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from whatsapp_exporter import WhatsAppExporter
 
 
+def _export_one(jid, backup_mode, backup_path, limit):
+    """Export a single contact in a worker process.
+
+    Each worker builds its own exporter (and its own SQLite connection,
+    which cannot be shared across processes).
+    """
+    exporter = WhatsAppExporter(backup_mode=backup_mode, backup_base_path=backup_path)
+    try:
+        return exporter.export_conversation(jid, None, limit, False)
+    finally:
+        exporter.close()
+
+
 def main():
     """Main function."""
     print("💬 WHATSAPP CONVERSATION EXPORTER")
@@ -105,8 +119,9 @@ def main():
                         contact_input = input("Enter contact name or phone number: ").strip()
                         result = exporter.export_conversation(contact_input)
                         if result:
+                            filepath, _ = result
                             print(f"\n🎉 Export successful!")
-                            print(f"📁 File: {result}")
+                            print(f"📁 File: {filepath}")
                         return
                     elif sub_choice == "2":
                         # Continue with full export
@@ -136,15 +151,21 @@ def main():
     try:
         # Initialize exporter
         exporter = WhatsAppExporter(backup_mode=backup_mode, backup_base_path=backup_path)
-        
+
+        # Warm the page cache with one sequential pass over the message
+        # table; the per-contact queries that follow then read from RAM
+        # instead of seeking around a cold file
+        exporter.db_manager.fetch_one("SELECT count(*), sum(length(ZTEXT)) FROM ZWAMESSAGE")
+
         # Single contact export
         if contact_name:
             print(f"🎯 Single contact export: {contact_name}")
             result = exporter.export_conversation(contact_name, backup_mode, limit, recent)
-            
+
             if result:
+                filepath, _ = result
                 print(f"\n🎉 Export successful!")
-                print(f"📁 File: {result}")
+                print(f"📁 File: {filepath}")
             else:
                 print("❌ Export failed")
                 # Show available contacts with reactions
@@ -171,31 +192,40 @@ def main():
         total_reactions = 0
         
         try:
-            for i, contact in enumerate(contacts, 1):
-                print(f"\n📝 [{i}/{len(contacts)}] Exporting: {contact['name']}")
-                if contact['reaction_count'] > 0:
-                    print(f"   📊 Has {contact['reaction_count']} reaction messages")
-                
-                try:
-                    result = exporter.export_conversation(contact['jid'], None, limit, False)
-                    
+            # Contacts are independent, so fan the exports out over the CPU
+            # cores; each worker process opens its own database connection
+            workers = min(os.cpu_count() or 1, len(contacts))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(_export_one, c['jid'], backup_mode, backup_path, limit): c
+                    for c in contacts
+                }
+                for i, future in enumerate(as_completed(futures), 1):
+                    contact = futures[future]
+                    print(f"\n📝 [{i}/{len(contacts)}] Exporting: {contact['name']}")
+                    if contact['reaction_count'] > 0:
+                        print(f"   📊 Has {contact['reaction_count']} reaction messages")
+
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"   ❌ Error exporting {contact['name']}: {e}")
+                        continue
+
                     if result:
+                        # The exporter reports the size it just wrote, so no
+                        # extra stat() per exported file is needed here
+                        filepath, size_bytes = result
                         exported_files.append({
                             'contact': contact['name'],
-                            'file': result,
-                            'size': os.path.getsize(result),
+                            'file': filepath,
+                            'size': size_bytes,
                             'reactions': contact['reaction_count']
                         })
                         total_reactions += contact['reaction_count']
-                        print(f"   ✅ Exported to: {os.path.basename(result)}")
+                        print(f"   ✅ Exported to: {os.path.basename(filepath)}")
                     else:
                         print(f"   ❌ Failed to export {contact['name']}")
-                except Exception as e:
-                    print(f"   ❌ Error exporting {contact['name']}: {e}")
-                    # Reset connection on error to prevent database lock issues
-                    exporter.close()
-                    exporter = WhatsAppExporter(backup_mode=backup_mode, backup_base_path=backup_path)
-                    continue
         except KeyboardInterrupt:
             print(f"\n⏹️ Export interrupted by user")
         
@@ -211,10 +241,12 @@ def main():
         print(f"📄 Total export size: {total_size:,} bytes ({total_size/1024/1024:.1f} MB)")
         
         print(f"\n📁 Exported files:")
+        # Index contacts by name once instead of scanning the list per file
+        contact_by_name = {c['name']: c for c in contacts}
         for i, exp in enumerate(exported_files, 1):
             size_kb = exp['size'] / 1024
             # Find contact info for phone number display
-            contact_info = next((c for c in contacts if c['name'] == exp['contact']), None)
+            contact_info = contact_by_name.get(exp['contact'])
             phone_display = f" ({contact_info['formatted_phone']})" if contact_info and contact_info['formatted_phone'] else ""
             
             print(f"  {i:2d}. {exp['contact']}{phone_display}")
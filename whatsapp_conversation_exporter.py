@@ -14,17 +14,93 @@ Date: August 2025
 """
 
 import sqlite3
+import functools
+import io
 import os
 import sys
 import re
+from bisect import bisect_left
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 
+# Precompiled patterns for the hot blob decoders. Compiling once at import
+# time avoids re's cache lookup (and recompiles under cache pressure) on
+# every reaction/metadata scan.
+_RE_F09F_BASE = re.compile(rb'\xf0\x9f[\x00-\xff]{2}')
+_RE_SKIN = re.compile(rb'\xf0\x9f\x8f[\xbb-\xbf]')
+_RE_E2_BASE = re.compile(rb'\xe2[\x00-\xff]{2}')
+_RE_COLOR = re.compile(rb'\xef\xb8[\x80-\xbf]')
+_RE_JID = re.compile(rb'(\d+)@s\.whatsapp\.net')
+_RE_SANITIZE = re.compile(r"[^A-Za-z0-9'`{}]")
+# The lookahead demands at least one digit, brace or uppercase letter, so
+# the validator needs no Python-level character loop afterwards
+_RE_FWDHASH = re.compile(r"(?=[^A-Z0-9{}]*[A-Z0-9{}])[A-Za-z0-9]{2,24}['`][A-Za-z0-9{}]{2,48}")
+# Control bytes stripped from metadata fields before decoding; deleting
+# them with bytes.translate runs at C speed (they never occur inside
+# multi-byte UTF-8 sequences, so this is safe pre-decode)
+_CTRL_BYTES = bytes(range(0x20))
+
+
+def _decode_varint(blob, pos):
+    """Decode a protobuf varint starting at pos; returns (value, next_pos).
+
+    Returns (None, pos) when the bytes at pos are not a valid varint.
+    """
+    result = 0
+    shift = 0
+    while pos < len(blob):
+        byte = blob[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 64:
+            break
+    return None, pos
+
+
+@functools.lru_cache(maxsize=4096)
+def _initials_of(name):
+    """Initials of a name (first letter of each word, 3 chars max).
+
+    Cached because the same sender names recur for every reaction decoded.
+    """
+    words = name.split()
+    initials = ''.join([word[0].upper() for word in words if word])
+    return initials[:3] if initials else "?"
+
+
 class ForwardInfo:
     def __init__(self, hash_id):
         self.hash_id = hash_id
 
 
+@dataclass(slots=True)
+class Message:
+    """One conversation message.
+
+    Slots halve the per-message footprint versus a dict and make field
+    access a fixed-offset read, which matters at 100k+ messages.
+    """
+    message_id: int
+    content: str
+    date: str
+    _ts: float
+    from_jid: str
+    to_jid: str
+    is_from_me: bool
+    reaction_emoji: str
+    parent_message_id: int
+    quoted_text: object
+    is_forwarded: bool
+    sender_name: str
+    _media_item_id: int
+    message_type: int
+    media_info: dict
+
+
 class WhatsAppExporter:
     def __init__(self, db_path=None, backup_mode=False, backup_base_path=None):
         """Initialize with WhatsApp database.
@@ -49,6 +125,7 @@ class WhatsAppExporter:
             self.media_base_path = os.path.expanduser("~/Library/Group Containers/group.net.whatsapp.WhatsApp.shared/Message")
             
         self.contact_cache = {}
+        self._group_initials_cache = {}
         self._db_connection = None
         self._connection_lock = None
         print(f"📁 Database: {self.db_path}")
@@ -69,10 +146,23 @@ class WhatsAppExporter:
                 )
                 # Enable WAL mode for better concurrent access
                 self._db_connection.execute("PRAGMA journal_mode=WAL")
-                self._db_connection.execute("PRAGMA synchronous=NORMAL")
+                # We only read the database, so durability guarantees are irrelevant
+                self._db_connection.execute("PRAGMA synchronous=OFF")
                 self._db_connection.execute("PRAGMA temp_store=MEMORY")
                 self._db_connection.execute("PRAGMA mmap_size=268435456")  # 256MB
+                self._db_connection.execute("PRAGMA cache_size=-65536")  # 64MB page cache
                 self._db_connection.commit()
+                # Covering indexes for the conversation filters; without them
+                # SQLite scans the whole message table per conversation.
+                # Separate try block: a read-only database just skips this.
+                try:
+                    self._db_connection.execute(
+                        "CREATE INDEX IF NOT EXISTS idx_msg_from_date ON ZWAMESSAGE(ZFROMJID, ZMESSAGEDATE)")
+                    self._db_connection.execute(
+                        "CREATE INDEX IF NOT EXISTS idx_msg_to_date ON ZWAMESSAGE(ZTOJID, ZMESSAGEDATE)")
+                    self._db_connection.commit()
+                except Exception:
+                    pass
             except Exception as e:
                 print(f"⚠️ Failed to configure database connection: {e}")
                 # Fallback to basic connection
@@ -87,7 +177,11 @@ class WhatsAppExporter:
             except Exception:
                 pass
             self._db_connection = None
-    
+
+    def close(self):
+        """Release the exporter's resources (currently just the connection)."""
+        self._close_db_connection()
+
     def _find_backup_database(self):
         """Find wtsexporter database by scanning for the largest 40-character filename."""
         print("🔍 Looking for wtsexporter database...")
@@ -190,7 +284,34 @@ class WhatsAppExporter:
             print(f"⚠️ Error getting contact name for {jid}: {e}")
             self.contact_cache[jid] = jid
             return jid
-    
+
+    def _preload_contact_names(self, jids):
+        """Resolve many JIDs to names with one batched query instead of N lookups."""
+        missing = [jid for jid in jids if jid and jid not in self.contact_cache]
+        if not missing:
+            return
+
+        try:
+            conn = self._get_db_connection()
+            cursor = conn.cursor()
+            # SQLite caps the number of bound variables (~999), so chunk the IN list
+            for start in range(0, len(missing), 900):
+                chunk = missing[start:start + 900]
+                placeholders = ','.join(['?'] * len(chunk))
+                cursor.execute(
+                    f"SELECT ZCONTACTJID, ZPARTNERNAME FROM ZWACHATSESSION WHERE ZCONTACTJID IN ({placeholders})",
+                    chunk)
+                for jid, name in cursor.fetchall():
+                    if jid and name:
+                        self.contact_cache[jid] = self._clean_contact_name(name)
+
+            # JIDs without a chat session get the same fallback as _get_contact_name
+            for jid in missing:
+                if jid not in self.contact_cache:
+                    self.contact_cache[jid] = f"Contact ({jid.split('@')[0]})" if '@' in jid else jid
+        except Exception as e:
+            print(f"⚠️ Error preloading contact names: {e}")
+
     def _convert_timestamp(self, timestamp):
         """Convert WhatsApp timestamp."""
         if not timestamp:
@@ -204,87 +325,67 @@ class WhatsAppExporter:
         """Decode emoji reaction from blob."""
         if not blob:
             return None
+        # Cheap marker test (C-level memchr) rejects the common emoji-free
+        # blob before any regex machinery runs
+        if b'\xf0\x9f' not in blob and b'\xe2' not in blob:
+            return None
         try:
-            hex_data = blob.hex().upper()
-            
-            # Find emoji with automatic modifier detection
+            # Scan the raw bytes directly - converting to an uppercased hex
+            # string doubled memory and forced the regexes over twice the data
             emoji = None
-            if 'F09F' in hex_data:
-                # Modern emojis (F09F prefix) - may have skin tone modifiers
-                base_matches = re.findall(r'F09F[0-9A-F]{4}', hex_data)
-                if base_matches:
-                    # Check for skin tone modifier after base emoji
-                    base_emoji = base_matches[0]
-                    base_pos = hex_data.find(base_emoji)
-                    remaining = hex_data[base_pos + len(base_emoji):]
-                    
-                    # Look for skin tone modifier (F09F8F[BB-BF])
-                    skin_modifier = re.match(r'F09F8F(BB|BC|BD|BE|BF)', remaining)
-                    if skin_modifier:
-                        full_sequence = base_emoji + skin_modifier.group(0)
-                        emoji = bytes.fromhex(full_sequence).decode('utf-8')
-                    else:
-                        emoji = bytes.fromhex(base_emoji).decode('utf-8')
-                        
-            elif hex_data.startswith('E2') or 'E2' in hex_data:
-                # Legacy Unicode symbols (E2xx prefix) - may have color modifiers
-                base_matches = re.findall(r'E2[0-9A-F]{4}', hex_data)
-                if base_matches:
-                    base_emoji = base_matches[0]
-                    base_pos = hex_data.find(base_emoji)
-                    remaining = hex_data[base_pos + len(base_emoji):]
-                    
-                    # Look for color modifier (EFB8[8F-AB])
-                    color_modifier = re.match(r'EFB8[8-9A-B][0-9A-F]', remaining)
+            base_match = _RE_F09F_BASE.search(blob)
+            if base_match:
+                # Modern emojis (F0 9F prefix) - may have skin tone modifiers
+                sequence = base_match.group(0)
+                skin_modifier = _RE_SKIN.match(blob, base_match.end())
+                if skin_modifier:
+                    sequence += skin_modifier.group(0)
+                emoji = sequence.decode('utf-8')
+            else:
+                # Legacy Unicode symbols (E2 prefix) - may have color modifiers
+                base_match = _RE_E2_BASE.search(blob)
+                if base_match:
+                    sequence = base_match.group(0)
+                    color_modifier = _RE_COLOR.match(blob, base_match.end())
                     if color_modifier:
-                        full_sequence = base_emoji + color_modifier.group(0)
-                        emoji = bytes.fromhex(full_sequence).decode('utf-8')
-                    else:
-                        emoji = bytes.fromhex(base_emoji).decode('utf-8')
-            
+                        sequence += color_modifier.group(0)
+                    emoji = sequence.decode('utf-8')
+
             if not emoji:
                 return None
-            
+
             # For groups, try to extract who reacted
             if is_group:
-                return self._decode_group_reactions(hex_data, emoji, group_jid)
+                return self._decode_group_reactions(blob, emoji, group_jid)
             else:
                 return emoji
-                
+
         except Exception:
             pass
         return None
-    
-    def _decode_group_reactions(self, hex_data, emoji, group_jid=None):
+
+    def _decode_group_reactions(self, blob, emoji, group_jid=None):
         """Decode group reactions with person names."""
         try:
-            # Find JID patterns in hex data
-            jid_matches = re.findall(r'333[0-9A-F]+?40732E77686174736170702E6E6574', hex_data)
-            
-            if not jid_matches:
+            # Find reactor phone numbers directly in the blob bytes
+            phone_matches = _RE_JID.findall(blob)
+
+            if not phone_matches:
                 return emoji
-            
+
             reactors = []
-            for jid_hex in jid_matches:
+            for phone in phone_matches:
                 try:
-                    # Decode JID
-                    jid_bytes = bytes.fromhex(jid_hex)
-                    jid_raw = jid_bytes.decode('utf-8', errors='ignore')
-                    
-                    # Extract clean phone number
-                    phone_match = re.search(r'(\d+)@s\.whatsapp\.net', jid_raw)
-                    if phone_match:
-                        phone = phone_match.group(1)
-                        clean_jid = f'{phone}@s.whatsapp.net'
-                        
-                        # Get name and create unique initials for this group
-                        name = self._get_contact_name(clean_jid)
-                        if name and name != clean_jid and 'Contact (' not in name:
-                            if group_jid:
-                                initials = self._get_group_initials_for_jid(group_jid, clean_jid)
-                            else:
-                                initials = self._get_initials(name)
-                            reactors.append(initials)
+                    clean_jid = f"{phone.decode('ascii')}@s.whatsapp.net"
+
+                    # Get name and create unique initials for this group
+                    name = self._get_contact_name(clean_jid)
+                    if name and name != clean_jid and 'Contact (' not in name:
+                        if group_jid:
+                            initials = self._get_group_initials_for_jid(group_jid, clean_jid)
+                        else:
+                            initials = self._get_initials(name)
+                        reactors.append(initials)
                 except:
                     continue
             
@@ -410,10 +511,10 @@ class WhatsAppExporter:
         reactions_timeline = []
         
         for msg in messages:
-            if msg.get('reaction_emoji') and msg.get('date'):
+            if msg.reaction_emoji and msg.date:
                 try:
                     # Parse the reaction emoji(s)
-                    reaction_text = msg['reaction_emoji']
+                    reaction_text = msg.reaction_emoji
                     
                     # Handle group reactions format [AB:😂;CD:😍]
                     if reaction_text.startswith('[') and reaction_text.endswith(']'):
@@ -427,7 +528,7 @@ class WhatsAppExporter:
                                 mood = mood_categories.get(emoji, 'unknown')
                                 if mood != 'unknown':
                                     reactions_timeline.append({
-                                        'date': msg['date'],
+                                        'date': msg.date,
                                         'emoji': emoji,
                                         'mood': mood,
                                         'person': person.strip(),
@@ -439,10 +540,10 @@ class WhatsAppExporter:
                         mood = mood_categories.get(emoji, 'unknown')
                         if mood != 'unknown':
                             reactions_timeline.append({
-                                'date': msg['date'],
+                                'date': msg.date,
                                 'emoji': emoji,
                                 'mood': mood,
-                                'person': 'Contact' if not msg.get('is_from_me') else 'Moi',
+                                'person': 'Contact' if not msg.is_from_me else 'Moi',
                                 'is_group': False
                             })
                 except Exception:
@@ -471,8 +572,8 @@ class WhatsAppExporter:
         
         try:
             # Get conversation date range
-            start_date = datetime.strptime(messages[0]['date'], '%Y-%m-%d %H:%M:%S')
-            end_date = datetime.strptime(messages[-1]['date'], '%Y-%m-%d %H:%M:%S')
+            start_date = datetime.strptime(messages[0].date, '%Y-%m-%d %H:%M:%S')
+            end_date = datetime.strptime(messages[-1].date, '%Y-%m-%d %H:%M:%S')
             
             # Find the Monday of the first week and the Sunday of the last week
             start_monday = start_date - timedelta(days=start_date.weekday())
@@ -485,7 +586,7 @@ class WhatsAppExporter:
             # First, mark weeks with any conversation activity
             for msg in messages:
                 try:
-                    msg_date = datetime.strptime(msg['date'], '%Y-%m-%d %H:%M:%S')
+                    msg_date = datetime.strptime(msg.date, '%Y-%m-%d %H:%M:%S')
                     week_start = msg_date - timedelta(days=msg_date.weekday())
                     week_key = week_start.strftime('%Y-%m-%d')
                     
@@ -590,24 +691,8 @@ class WhatsAppExporter:
         """Generate initials from a name."""
         if not name:
             return "?"
-        
-        # Split name and take first letter of each word
-        words = name.split()
-        initials = ''.join([word[0].upper() for word in words if word])
-        
-        # Limit to 3 characters max
-        return initials[:3] if initials else "?"
-        """Generate initials from a name."""
-        if not name:
-            return "?"
-        
-        # Split name and take first letter of each word
-        words = name.split()
-        initials = ''.join([word[0].upper() for word in words if word])
-        
-        # Limit to 3 characters max
-        return initials[:3] if initials else "?"
-    
+        return _initials_of(name)
+
     def _get_group_unique_initials(self, group_jid):
         """Generate unique initials for all members of a group."""
         try:
@@ -642,8 +727,11 @@ class WhatsAppExporter:
                 name_to_initials[name] = basic_initials
                 initials_count[basic_initials] = initials_count.get(basic_initials, 0) + 1
             
-            # Resolve conflicts by using more letters from first names
+            # Resolve conflicts by using more letters from first names.
+            # Track assigned initials in a set: membership tests against
+            # final_initials.values() rescanned the dict per iteration.
             final_initials = {}
+            assigned = set()
             for name, initials in name_to_initials.items():
                 if initials_count[initials] > 1:
                     # There's a conflict, need to make unique
@@ -663,7 +751,7 @@ class WhatsAppExporter:
                         # If still conflict, add more characters from first name
                         counter = 3
                         base_unique = unique_initials
-                        while unique_initials in final_initials.values():
+                        while unique_initials in assigned:
                             if len(first_name) > counter - 1:
                                 first_part = first_name[0].upper() + first_name[1:counter].lower()
                                 unique_initials = first_part + last_part
@@ -678,7 +766,8 @@ class WhatsAppExporter:
                         final_initials[name] = initials
                 else:
                     final_initials[name] = initials
-            
+                assigned.add(final_initials[name])
+
             # Create reverse mapping: JID to unique initials
             jid_to_initials = {}
             for jid, name in jid_to_name.items():
@@ -693,14 +782,10 @@ class WhatsAppExporter:
     def _get_group_initials_for_jid(self, group_jid, member_jid):
         """Get unique initials for a specific member in a group."""
         # Cache group initials to avoid recalculating
-        cache_key = f"group_initials_{group_jid}"
-        if not hasattr(self, '_group_initials_cache'):
-            self._group_initials_cache = {}
-        
-        if cache_key not in self._group_initials_cache:
-            self._group_initials_cache[cache_key] = self._get_group_unique_initials(group_jid)
-        
-        return self._group_initials_cache[cache_key].get(member_jid, "?")
+        cached = self._group_initials_cache.get(group_jid)
+        if cached is None:
+            cached = self._group_initials_cache[group_jid] = self._get_group_unique_initials(group_jid)
+        return cached.get(member_jid, "?")
 
     def _get_conversation_participants(self, contact_jid):
         """Get all participants in a conversation with their names and phone numbers."""
@@ -914,62 +999,60 @@ class WhatsAppExporter:
         
         return None
     
-    def _extract_quoted_text(self, cursor, media_item_id):
-        """Extract quoted text from media metadata."""
+    def _extract_quoted_text(self, blob, media_path=None, media_title=None):
+        """Extract quoted text from media metadata.
+
+        Works purely on data already fetched with the conversation query
+        (the metadata blob plus the media path/title columns), so it issues
+        no SQL of its own.
+        """
         try:
-            # First, try to get the media info itself (for media quotes)
-            cursor.execute("SELECT ZMEDIALOCALPATH, ZTITLE, ZMESSAGE FROM ZWAMEDIAITEM WHERE Z_PK = ?", (media_item_id,))
-            media_result = cursor.fetchone()
-            
-            if media_result and media_result[0]:  # Has media path
-                media_path = media_result[0]
-                media_title = media_result[1]
-                
+            # First, check the media info itself (for media quotes)
+            if media_path:
                 # Get media type from path extension
-                if media_path:
-                    ext = os.path.splitext(media_path)[1].lower()
-                    if ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
-                        media_type = "Image"
-                    elif ext in ['.mp4', '.mov', '.avi']:
-                        media_type = "Video"
-                    elif ext in ['.mp3', '.wav', '.m4a']:
-                        media_type = "Audio"
-                    else:
-                        media_type = "Media"
-                    
-                    # If there's a title/comment with the media, include it
-                    if media_title and media_title.strip():
-                        return f"[{media_type}] {media_title.strip()}"
-                    else:
-                        return f"[{media_type}]"
-            
+                ext = os.path.splitext(media_path)[1].lower()
+                if ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
+                    media_type = "Image"
+                elif ext in ['.mp4', '.mov', '.avi']:
+                    media_type = "Video"
+                elif ext in ['.mp3', '.wav', '.m4a']:
+                    media_type = "Audio"
+                else:
+                    media_type = "Media"
+
+                # If there's a title/comment with the media, include it
+                if media_title and media_title.strip():
+                    return f"[{media_type}] {media_title.strip()}"
+                else:
+                    return f"[{media_type}]"
+
             # If no direct media info, try to extract from metadata blob
-            cursor.execute("SELECT ZMETADATA FROM ZWAMEDIAITEM WHERE Z_PK = ?", (media_item_id,))
-            result = cursor.fetchone()
-            if not result or not result[0]:
+            if not blob:
                 return None
-            
-            blob = result[0]
+
             i = 0
             
             while i < len(blob) - 2:
                 tag_byte = blob[i]
                 if (tag_byte & 0x7) == 2:  # Length-delimited field
                     tag = tag_byte >> 3
-                    length = blob[i + 1]
-                    
-                    if i + 2 + length <= len(blob) and length > 2 and tag == 1:
-                        field_data = blob[i + 2:i + 2 + length]
+                    # Lengths are varints: a single-byte read truncated any
+                    # field of 128 bytes or more and derailed the scan
+                    length, data_start = _decode_varint(blob, i + 1)
+                    if length is None:
+                        i += 1
+                        continue
+
+                    if data_start + length <= len(blob) and length > 2 and tag == 1:
+                        field_data = blob[data_start:data_start + length]
                         try:
-                            text = field_data.decode('utf-8', errors='ignore').strip()
-                            text = re.sub(r'[\x00-\x1f]+', '', text)
-                            
+                            text = field_data.translate(None, _CTRL_BYTES).decode('utf-8', errors='ignore').strip()
+
+
                             if len(text) > 3:
                                 # Check for forward hash (only if it really looks like one)
-                                sanitized = re.sub(r"[^A-Za-z0-9'`{}]", "", text)
-                                if (len(sanitized) > 10 and 
-                                    re.fullmatch(r"[A-Za-z0-9]{2,24}['`][A-Za-z0-9{}]{2,48}", sanitized) and
-                                    any(c.isdigit() or c in '{}' or (c.isalpha() and c.isupper()) for c in sanitized)):
+                                sanitized = _RE_SANITIZE.sub('', text)
+                                if len(sanitized) > 10 and _RE_FWDHASH.fullmatch(sanitized):
                                     return ForwardInfo(sanitized)
                                 
                                 # Regular quote - be more permissive
@@ -980,8 +1063,8 @@ class WhatsAppExporter:
                                     return text
                         except Exception:
                             pass
-                    
-                    i += 2 + length if i + 2 + length <= len(blob) else i + 1
+
+                    i = data_start + length if data_start + length <= len(blob) else i + 1
                 else:
                     i += 1
             
@@ -991,30 +1074,39 @@ class WhatsAppExporter:
         except Exception:
             return None
     
-    def _parse_metadata_replies(self, cursor, targets):
+    def _parse_metadata_replies(self, meta_map, targets):
         """Parse metadata to find reply relationships."""
         if not targets:
             return
-        
-        # Get metadata
-        media_ids = [m['_media_item_id'] for m in targets if m.get('_media_item_id')]
-        if not media_ids:
-            return
-        
-        placeholders = ','.join(['?'] * len(media_ids))
-        cursor.execute(f"SELECT Z_PK,ZMETADATA FROM ZWAMEDIAITEM WHERE Z_PK IN ({placeholders})", media_ids)
-        meta_map = {r[0]: r[1] for r in cursor.fetchall() if r[1]}
-        
+
         # Index original messages
         originals = {}
         for m in self.messages:
-            text = (m.get('content') or '').strip()
+            text = (m.content or '').strip()
             if len(text) >= 40:
                 originals.setdefault(text[:60], []).append(m)
+
+        # Shingle index over the keys: a fragment's 16-char prefix finds its
+        # candidate keys with one dict hit instead of a substring scan over
+        # every original per target. Keys are always >= 40 chars here.
+        shingles = {}
+        prefixes = {}
+        for key in originals:
+            for i in range(len(key) - 15):
+                shingles.setdefault(key[i:i + 16], set()).add(key)
+            prefixes.setdefault(key[:25], set()).add(key)
+
+        # Sort each candidate bucket by timestamp with a parallel ts array,
+        # so the 48-hour window below is a binary search instead of a filter
+        # over every candidate
+        originals_ts = {}
+        for key, candidates in originals.items():
+            candidates.sort(key=lambda m: m._ts or 0)
+            originals_ts[key] = [m._ts or 0 for m in candidates]
         
         # Process targets
         for msg in targets:
-            blob = meta_map.get(msg.get('_media_item_id'))
+            blob = meta_map.get(msg._media_item_id)
             if not blob:
                 continue
             
@@ -1025,10 +1117,13 @@ class WhatsAppExporter:
                 b = blob[i]
                 if (b & 7) == 2 and i + 1 < len(blob):
                     tag = b >> 3
-                    length = blob[i + 1]
-                    data = blob[i + 2:i + 2 + length]
-                    i += 2 + length
-                    
+                    length, data_start = _decode_varint(blob, i + 1)
+                    if length is None:
+                        i += 1
+                        continue
+                    data = blob[data_start:data_start + length]
+                    i = data_start + length
+
                     if 10 < length < 130 and tag in (5, 6, 9, 13, 14):
                         try:
                             text = data.decode('utf-8', 'ignore').strip()
@@ -1042,48 +1137,50 @@ class WhatsAppExporter:
             if len(parts) < 2:
                 continue
             
-            # Find matching original
+            # Find matching originals through the shingle index; the dict
+            # lookups replace the old full scan of originals.items(), and a
+            # direct substring check confirms each candidate
             reconstruction = ' '.join(parts)
+            matched_keys = set()
+            for part in parts:
+                if len(part) > 15:
+                    for key in shingles.get(part[:16], ()):
+                        if part in key:
+                            matched_keys.add(key)
+            for i in range(len(reconstruction) - 24):
+                matched_keys.update(prefixes.get(reconstruction[i:i + 25], ()))
+
             best_match = None
             best_delta = None
-            
-            for key, candidates in originals.items():
-                match_found = any(len(part) > 15 and part in key for part in parts)
-                if not match_found and key[:25] in reconstruction:
-                    match_found = True
-                
-                if match_found:
-                    for candidate in candidates:
-                        if (candidate.get('is_from_me') == msg.get('is_from_me') or
-                            not candidate.get('date') or not msg.get('date')):
-                            continue
-                        
-                        try:
-                            t1 = datetime.strptime(candidate['date'], '%Y-%m-%d %H:%M:%S')
-                            t2 = datetime.strptime(msg['date'], '%Y-%m-%d %H:%M:%S')
-                            if t1 >= t2:
-                                continue
-                            
-                            delta = (t2 - t1).total_seconds()
-                            if delta > 48 * 3600:
-                                continue
-                            
-                            if best_delta is None or delta < best_delta:
-                                best_match = candidate
-                                best_delta = delta
-                        except:
-                            continue
+            target_ts = msg._ts
+
+            for key in matched_keys:
+                if target_ts is None:
+                    break
+                candidates = originals[key]
+                ts_list = originals_ts[key]
+                # Binary-search the [target - 48h, target) window; everything
+                # outside it was skipped one comparison at a time before
+                lo = bisect_left(ts_list, target_ts - 48 * 3600)
+                hi = bisect_left(ts_list, target_ts)
+                for candidate in candidates[lo:hi]:
+                    if (candidate.is_from_me == msg.is_from_me or
+                        candidate._ts is None):
+                        continue
+
+                    delta = target_ts - candidate._ts
+                    if best_delta is None or delta < best_delta:
+                        best_match = candidate
+                        best_delta = delta
             
             # Apply quote
-            if best_match and not msg.get('quoted_text'):
-                content = best_match['content']
+            if best_match and not msg.quoted_text:
+                content = best_match.content
                 if len(content) > 90:
                     words = content[:90].split()
                     content = ' '.join(words[:-1]) + '...' if len(words) > 1 else content[:85] + '...'
-                msg['quoted_text'] = content
-    
-                msg['quoted_text'] = content
-    
+                msg.quoted_text = content
+
     def get_contacts_with_reactions(self):
         """Get contacts with reactions."""
         try:
@@ -1154,27 +1251,28 @@ class WhatsAppExporter:
             is_group = contact_jid.endswith('@g.us')
             
             if is_group:
-                # Group conversation query with sender names and media
-                query = """
-                    SELECT 
+                # Group conversation query with sender JIDs and media. Sender
+                # names are resolved in Python from the preloaded contact
+                # cache - joining ZWACHATSESSION here re-resolved each sender
+                # once per message row
+                select_block = """
+                    SELECT
                         m.Z_PK, m.ZTEXT, m.ZMESSAGEDATE, m.ZFROMJID, m.ZTOJID,
                         m.ZISFROMME, m.ZFLAGS, i.ZRECEIPTINFO, m.ZPARENTMESSAGE, m.ZMEDIAITEM,
-                        cs.ZPARTNERNAME, gm.ZMEMBERJID, m.ZMESSAGETYPE,
+                        NULL, gm.ZMEMBERJID, m.ZMESSAGETYPE,
                         mi.ZMEDIALOCALPATH, mi.ZTITLE, mi.ZFILESIZE
                     FROM ZWAMESSAGE m
                     LEFT JOIN ZWAMESSAGEINFO i ON m.Z_PK = i.ZMESSAGE
                     LEFT JOIN ZWAGROUPMEMBER gm ON m.ZGROUPMEMBER = gm.Z_PK
-                    LEFT JOIN ZWACHATSESSION cs ON gm.ZMEMBERJID = cs.ZCONTACTJID
                     LEFT JOIN ZWAMEDIAITEM mi ON m.ZMEDIAITEM = mi.Z_PK
-                    WHERE (m.ZFROMJID = ? OR m.ZTOJID = ?)
+                    WHERE {jid_filter}
                     AND m.ZMESSAGETYPE IN (0, 1, 2, 3, 5, 9, 13, 14)
                     AND (m.ZTEXT IS NOT NULL OR m.ZMEDIAITEM IS NOT NULL)
-                    ORDER BY m.ZMESSAGEDATE {}
-                """.format("DESC" if recent else "ASC")
+                """
             else:
                 # Individual conversation query with media
-                query = """
-                    SELECT 
+                select_block = """
+                    SELECT
                         m.Z_PK, m.ZTEXT, m.ZMESSAGEDATE, m.ZFROMJID, m.ZTOJID,
                         m.ZISFROMME, m.ZFLAGS, i.ZRECEIPTINFO, m.ZPARENTMESSAGE, m.ZMEDIAITEM,
                         NULL, NULL, m.ZMESSAGETYPE,
@@ -1182,50 +1280,63 @@ class WhatsAppExporter:
                     FROM ZWAMESSAGE m
                     LEFT JOIN ZWAMESSAGEINFO i ON m.Z_PK = i.ZMESSAGE
                     LEFT JOIN ZWAMEDIAITEM mi ON m.ZMEDIAITEM = mi.Z_PK
-                    WHERE (m.ZFROMJID = ? OR m.ZTOJID = ?)
+                    WHERE {jid_filter}
                     AND m.ZMESSAGETYPE IN (0, 1, 2, 3, 5, 9, 13, 14)
                     AND (m.ZTEXT IS NOT NULL OR m.ZMEDIAITEM IS NOT NULL)
-                    ORDER BY m.ZMESSAGEDATE {}
-                """.format("DESC" if recent else "ASC")
-            
+                """
+
+            # The OR over two different columns defeats index selection;
+            # UNION ALL lets SQLite drive each arm from its own
+            # (jid, date) index. The second arm excludes rows the first
+            # already matched so no message appears twice.
+            query = (select_block.format(jid_filter="m.ZFROMJID = ?")
+                     + " UNION ALL "
+                     + select_block.format(jid_filter="(m.ZTOJID = ? AND m.ZFROMJID IS NOT ?)")
+                     + " ORDER BY 3 {}".format("DESC" if recent else "ASC"))
+            params = (contact_jid, contact_jid, contact_jid)
+
             if limit:
                 query += f" LIMIT {limit}"
-            
-            cursor.execute(query, (contact_jid, contact_jid))
-            rows = cursor.fetchall()
-            
-            # If recent=True, reverse the order to maintain chronological display
-            if recent:
-                rows = list(reversed(rows))
-            
-            print(f"📋 Found {len(rows)} messages...")
-            
-            # Collect all messages
+
+            if os.environ.get('WA_EXPORT_DEBUG'):
+                for plan_row in cursor.execute("EXPLAIN QUERY PLAN " + query, params):
+                    print(f"   🔍 Query plan: {plan_row}")
+
+            cursor.execute(query, params)
+            # Stream rows straight off the cursor instead of materializing a
+            # second copy of the whole result set with fetchall(); the driver
+            # batches fetches under the hood via arraysize
+            cursor.arraysize = 1000
+
             self.messages = []
             message_lookup = {}
-            
-            for row in rows:
-                # Decode reaction
-                reaction_emoji = None
-                if row[7]:
-                    reaction_emoji = self._decode_reaction(row[7], is_group, contact_jid if is_group else None)
-                
-                # Extract quoted text - only for messages that are actually quotes/replies
-                quoted_text = None
-                if row[8]:  # parent_message_id exists - this is definitely a reply
-                    if row[9]:  # has media_item_id, try to extract from metadata
-                        quoted_text = self._extract_quoted_text(cursor, row[9])
-                        if isinstance(quoted_text, ForwardInfo):
-                            quoted_text = None  # Don't show forward hashes as quotes
-                
+            candidate_jids = set()
+            seen_forwards = set()
+            # (message, receipt_blob, member_jid) deferred to the post-fetch
+            # passes below, which need the batch-loaded caches
+            pending = []
+
+            for row in cursor:
                 flags = row[6] or 0
                 is_forwarded = bool(flags & 0x180 == 0x180)
-                
-                # For groups, get sender name
-                sender_name = None
-                if is_group and not bool(row[5]):  # Not from me
-                    sender_name = row[10]  # ZPARTNERNAME from the join
-                
+
+                date = self._convert_timestamp(row[2])
+
+                # Drop duplicate forwards as rows stream in, instead of
+                # rebuilding the whole message list in a trailing pass
+                if is_forwarded:
+                    forward_key = (row[1], date)
+                    if forward_key in seen_forwards:
+                        continue
+                    seen_forwards.add(forward_key)
+
+                # Collect JIDs for the batched name preload while streaming
+                if row[7]:
+                    for phone in _RE_JID.findall(row[7]):
+                        candidate_jids.add(f"{phone.decode('ascii')}@s.whatsapp.net")
+                if is_group and row[11]:
+                    candidate_jids.add(row[11])
+
                 # Handle media
                 media_info = None
                 if row[9]:  # has media_item_id
@@ -1238,53 +1349,100 @@ class WhatsAppExporter:
                             'file_size': row[15],
                             'message_type': row[12]
                         }
-                
-                message = {
-                    'message_id': row[0],
-                    'content': row[1],
-                    'date': self._convert_timestamp(row[2]),
-                    'from_jid': row[3],
-                    'to_jid': row[4],
-                    'is_from_me': bool(row[5]),
-                    'reaction_emoji': reaction_emoji,
-                    'parent_message_id': row[8],
-                    'quoted_text': quoted_text,
-                    'is_forwarded': is_forwarded,
-                    'sender_name': sender_name,
-                    '_media_item_id': row[9],
-                    'message_type': row[12],
-                    'media_info': media_info
-                }
+
+                message = Message(
+                    message_id=row[0],
+                    content=row[1],
+                    date=date,
+                    # Numeric epoch for cheap time comparisons (no strptime)
+                    _ts=(row[2] + 978307200) if row[2] else None,
+                    from_jid=row[3],
+                    to_jid=row[4],
+                    is_from_me=bool(row[5]),
+                    reaction_emoji=None,
+                    parent_message_id=row[8],
+                    quoted_text=None,
+                    is_forwarded=is_forwarded,
+                    sender_name=None,
+                    _media_item_id=row[9],
+                    message_type=row[12],
+                    media_info=media_info,
+                )
                 self.messages.append(message)
-                message_lookup[message['message_id']] = message
-            
+                message_lookup[message.message_id] = message
+                pending.append((message, row[7], row[11] if is_group else None))
+
+            # If recent=True, reverse the order to maintain chronological display
+            if recent:
+                self.messages.reverse()
+
+            print(f"📋 Found {len(self.messages)} messages...")
+
+            # Hydrate the contact cache up front: _decode_group_reactions would
+            # otherwise trigger one SELECT per reactor JID found in the blobs
+            self._preload_contact_names(candidate_jids)
+
+            # Fetch all quoted-metadata blobs in one batched query (chunked to
+            # respect SQLite's bound-variable limit) instead of one SELECT per
+            # reply message in _extract_quoted_text
+            media_ids = [m._media_item_id for m in self.messages if m._media_item_id]
+            meta_map = {}
+            for start in range(0, len(media_ids), 900):
+                chunk = media_ids[start:start + 900]
+                placeholders = ','.join(['?'] * len(chunk))
+                cursor.execute(
+                    f"SELECT Z_PK, ZMETADATA FROM ZWAMEDIAITEM WHERE Z_PK IN ({placeholders})",
+                    chunk)
+                for pk, blob in cursor.fetchall():
+                    if blob:
+                        meta_map[pk] = blob
+
+            # Decode reactions, sender names and quoted text now that the
+            # caches are hydrated
+            for message, receipt_blob, member_jid in pending:
+                if receipt_blob:
+                    message.reaction_emoji = self._decode_reaction(
+                        receipt_blob, is_group, contact_jid if is_group else None)
+
+                # Extract quoted text - only for messages that are actually
+                # quotes/replies, and only when the parent message isn't part
+                # of the conversation: when it is, the resolution pass below
+                # supplies the quote without touching the metadata blob
+                if message.parent_message_id and message._media_item_id:
+                    parent = message_lookup.get(message.parent_message_id)
+                    if not (parent and parent.content):
+                        media_info = message.media_info
+                        quoted_text = self._extract_quoted_text(
+                            meta_map.get(message._media_item_id),
+                            media_info['local_path'] if media_info else None,
+                            media_info['title'] if media_info else None)
+                        if not isinstance(quoted_text, ForwardInfo):
+                            message.quoted_text = quoted_text  # Don't show forward hashes as quotes
+
+                # For groups, get sender name from the preloaded cache
+                if member_jid and not message.is_from_me:
+                    name = self.contact_cache.get(member_jid)
+                    if name and 'Contact (' not in name:
+                        message.sender_name = name
+
             # Resolve parent message quotes
             for message in self.messages:
-                if (not message['quoted_text'] and message['parent_message_id'] 
-                    and message['parent_message_id'] in message_lookup):
-                    parent_msg = message_lookup[message['parent_message_id']]
-                    quoted_content = parent_msg['content'][:50]
-                    if len(parent_msg['content']) > 50:
+                if (not message.quoted_text and message.parent_message_id
+                    and message.parent_message_id in message_lookup):
+                    parent_msg = message_lookup[message.parent_message_id]
+                    if not parent_msg.content:
+                        continue
+                    quoted_content = parent_msg.content[:50]
+                    if len(parent_msg.content) > 50:
                         quoted_content += "..."
-                    message['quoted_text'] = quoted_content
+                    message.quoted_text = quoted_content
             
             # Parse metadata for replies
             reply_targets = [m for m in self.messages 
-                           if not m.get('quoted_text') and not m.get('parent_message_id') and m.get('_media_item_id')]
-            self._parse_metadata_replies(cursor, reply_targets)
-            
-            # Remove duplicate forwards
-            seen_forwards = set()
-            final_messages = []
-            for msg in self.messages:
-                if msg.get('is_forwarded'):
-                    forward_key = (msg['content'], msg['date'])
-                    if forward_key in seen_forwards:
-                        continue
-                    seen_forwards.add(forward_key)
-                final_messages.append(msg)
-            
-            return final_messages
+                           if not m.quoted_text and not m.parent_message_id and m._media_item_id]
+            self._parse_metadata_replies(meta_map, reply_targets)
+
+            return self.messages
             
         except Exception as e:
             print(f"❌ Database error: {e}")
@@ -1295,33 +1453,38 @@ class WhatsAppExporter:
         if not messages:
             return "No messages found."
         
-        output = []
-        output.append("=" * 80)
-        output.append(f"WhatsApp Conversation Export")
-        output.append(f"Contact: {contact_name}")
-        output.append(f"Messages: {len(messages)}")
-        output.append(f"Date Range: {messages[0]['date']} to {messages[-1]['date']}")
-        output.append(f"Exported: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        buf = io.StringIO()
+
+        def write_line(line):
+            buf.write(line)
+            buf.write('\n')
+
+        write_line("=" * 80)
+        write_line(f"WhatsApp Conversation Export")
+        write_line(f"Contact: {contact_name}")
+        write_line(f"Messages: {len(messages)}")
+        write_line(f"Date Range: {messages[0].date} to {messages[-1].date}")
+        write_line(f"Exported: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
         # Add mood timeline analysis
         mood_analysis = self._analyze_mood_timeline(messages)
         if mood_analysis and mood_analysis.get('weekly_timeline'):
-            output.append("")
-            output.append("MOOD TIMELINE:")
-            output.append("-" * 40)
+            write_line("")
+            write_line("MOOD TIMELINE:")
+            write_line("-" * 40)
             for timeline_line in mood_analysis['weekly_timeline']:
-                output.append(timeline_line)
-            output.append("Legend: 💬=messages, ·=no activity, emoji=dominant mood")
+                write_line(timeline_line)
+            write_line("Legend: 💬=messages, ·=no activity, emoji=dominant mood")
             if mood_analysis['total_reactions'] > 0:
-                output.append(f"Total reactions: {mood_analysis['total_reactions']}")
+                write_line(f"Total reactions: {mood_analysis['total_reactions']}")
         
         # Add participants list if we have the contact_jid
         if contact_jid:
             participants = self._get_conversation_participants(contact_jid)
             if participants:
-                output.append("")
-                output.append("PARTICIPANTS:")
-                output.append("-" * 40)
+                write_line("")
+                write_line("PARTICIPANTS:")
+                write_line("-" * 40)
                 
                 # Sort participants: "Moi" first, then alphabetically by name
                 participants_sorted = sorted(participants, key=lambda p: (p['name'] != 'Moi', p['name'].lower()))
@@ -1330,24 +1493,24 @@ class WhatsAppExporter:
                     if participant['name'] == 'Moi':
                         # Show "Moi" with phone number if available
                         if participant['formatted_phone'] and participant['formatted_phone'] not in ['Moi', 'Mon numéro']:
-                            output.append(f"• {participant['name']} ({participant['formatted_phone']})")
+                            write_line(f"• {participant['name']} ({participant['formatted_phone']})")
                         else:
-                            output.append(f"• {participant['name']}")
+                            write_line(f"• {participant['name']}")
                     else:
                         # For unknown names, show the phone number as the main identifier
                         if participant['name'] == "Inconnu" and participant['formatted_phone'] != "Numéro inconnu":
-                            output.append(f"• {participant['formatted_phone']}")
+                            write_line(f"• {participant['formatted_phone']}")
                         else:
                             # Show name with phone number
                             phone_display = participant['formatted_phone'] if participant['formatted_phone'] != "Numéro inconnu" else "Numéro inconnu"
-                            output.append(f"• {participant['name']} ({phone_display})")
+                            write_line(f"• {participant['name']} ({phone_display})")
         
-        output.append("=" * 80)
-        output.append("")
+        write_line("=" * 80)
+        write_line("")
         
         current_date = None
         for msg in messages:
-            message_date = msg['date']
+            message_date = msg.date
             if not message_date:
                 continue
                 
@@ -1356,7 +1519,7 @@ class WhatsAppExporter:
                 msg_date_part = message_date.split(' ')[0]
                 if current_date != msg_date_part:
                     current_date = msg_date_part
-                    output.append(f"\n--- {current_date} ---\n")
+                    write_line(f"\n--- {current_date} ---\n")
             except:
                 pass
             
@@ -1366,19 +1529,24 @@ class WhatsAppExporter:
             except:
                 time_part = "??:??"
             
-            prefix = ">" if msg['is_from_me'] else "<"
-            
+            # Hoist the hot attribute reads for the rest of the iteration
+            is_from_me = msg.is_from_me
+            media_info = msg.media_info
+            reaction_emoji = msg.reaction_emoji
+
+            prefix = ">" if is_from_me else "<"
+
             # Add indentation for non-user messages for better readability
-            indent = "" if msg['is_from_me'] else "  "
-            
+            indent = "" if is_from_me else "  "
+
             # For group messages, add sender name
             sender_prefix = ""
-            if msg.get('sender_name') and not msg['is_from_me']:
-                sender_prefix = f"{msg['sender_name']}: "
+            if msg.sender_name and not is_from_me:
+                sender_prefix = f"{msg.sender_name}: "
             
             # Handle quoted messages
-            if msg.get('quoted_text'):
-                citation = msg.get('quoted_text')
+            if msg.quoted_text:
+                citation = msg.quoted_text
                 
                 # Format citation directly after timestamp
                 if isinstance(citation, ForwardInfo):
@@ -1387,7 +1555,7 @@ class WhatsAppExporter:
                     lines = citation.split('\n')
                     citation_line = f"{indent}[{time_part}] ↳ {lines[0]}"
                     
-                output.append(citation_line)
+                write_line(citation_line)
                 
                 # Add additional citation lines if multi-line
                 if not isinstance(citation, ForwardInfo):
@@ -1395,15 +1563,15 @@ class WhatsAppExporter:
                     if len(lines) > 1:
                         for extra in lines[1:]:
                             # Indent to align with the arrow
-                            output.append(f"{indent}           {extra}")
+                            write_line(f"{indent}           {extra}")
                 
                 # Handle media in quoted messages
-                if msg.get('media_info'):
-                    media_type = self._get_media_type_name(msg['media_info'].get('message_type', 0))
-                    size_kb = msg['media_info'].get('file_size', 0) // 1024 if msg['media_info'].get('file_size') else 0
+                if media_info:
+                    media_type = self._get_media_type_name(media_info.get('message_type', 0))
+                    size_kb = media_info.get('file_size', 0) // 1024 if media_info.get('file_size') else 0
                     
                     # Check if media file exists locally
-                    media_path = self._prepare_media_path(contact_name, msg['media_info'])
+                    media_path = self._prepare_media_path(contact_name, media_info)
                     
                     # Use markdown link format for better VS Code support
                     if media_path:
@@ -1414,26 +1582,26 @@ class WhatsAppExporter:
                     
                     if size_kb > 0:
                         media_line += f" ({size_kb} KB)"
-                    if msg['media_info'].get('title'):
-                        media_line += f" - {msg['media_info']['title']}"
-                    output.append(media_line)
+                    if media_info.get('title'):
+                        media_line += f" - {media_info['title']}"
+                    write_line(media_line)
                 
                 # Add the reply message below with proper indentation and sender prefix
-                reply_content = msg['content'] or ''
+                reply_content = msg.content or ''
                 if reply_content.strip():
                     message_line = f"{indent}           {prefix} {sender_prefix}{reply_content}"
-                    if msg['reaction_emoji']:
-                        message_line += f" {msg['reaction_emoji']}"
-                    output.append(message_line)
+                    if reaction_emoji:
+                        message_line += f" {reaction_emoji}"
+                    write_line(message_line)
             else:
                 # Regular message - handle media first, then text
-                if msg.get('media_info'):
+                if media_info:
                     # Always show media with its filename
-                    media_type = self._get_media_type_name(msg['media_info'].get('message_type', 0))
-                    size_kb = msg['media_info'].get('file_size', 0) // 1024 if msg['media_info'].get('file_size') else 0
+                    media_type = self._get_media_type_name(media_info.get('message_type', 0))
+                    size_kb = media_info.get('file_size', 0) // 1024 if media_info.get('file_size') else 0
                     
                     # Check if media file exists locally
-                    media_path = self._prepare_media_path(contact_name, msg['media_info'])
+                    media_path = self._prepare_media_path(contact_name, media_info)
                     
                     # Use markdown link format for better VS Code support
                     if media_path:
@@ -1446,44 +1614,42 @@ class WhatsAppExporter:
                     
                     if size_kb > 0:
                         message_line += f" ({size_kb} KB)"
-                    if msg['media_info'].get('title'):
-                        message_line += f" - {msg['media_info']['title']}"
-                    if msg['reaction_emoji']:
-                        message_line += f" {msg['reaction_emoji']}"
+                    if media_info.get('title'):
+                        message_line += f" - {media_info['title']}"
+                    if reaction_emoji:
+                        message_line += f" {reaction_emoji}"
                     
-                    output.append(message_line)
+                    write_line(message_line)
                     
                     # Add content as separate comment line if it exists
-                    content = msg['content'] or ''
-                    if msg.get('is_forwarded'):
+                    content = msg.content or ''
+                    if msg.is_forwarded:
                         content = f"(forward) {content}"
                     
                     if content.strip():
                         comment_line = f"{indent}    💬 {content}"
-                        output.append(comment_line)
+                        write_line(comment_line)
                         
-                elif msg['content'] and msg['content'].strip():
+                elif msg.content and msg.content.strip():
                     # Text-only message (no media)
-                    content = msg['content']
-                    if msg.get('is_forwarded'):
+                    content = msg.content
+                    if msg.is_forwarded:
                         content = f"(forward) {content}"
                     message_line = f"{indent}[{time_part}] {prefix} {sender_prefix}{content}"
-                    if msg['reaction_emoji']:
-                        message_line += f" {msg['reaction_emoji']}"
-                    output.append(message_line)
+                    if reaction_emoji:
+                        message_line += f" {reaction_emoji}"
+                    write_line(message_line)
                 else:
                     # This should never happen - warn about completely empty messages
-                    if not msg.get('media_info') and not (msg['content'] and msg['content'].strip()):
-                        print(f"⚠️ Warning: Empty message found (ID: {msg.get('message_id')}, Type: {msg.get('message_type')})")
+                    if not media_info and not (msg.content and msg.content.strip()):
+                        print(f"⚠️ Warning: Empty message found (ID: {msg.message_id}, Type: {msg.message_type})")
                         # Still show it with a placeholder to avoid losing data
-                        output.append(f"{indent}[{time_part}] {prefix} {sender_prefix}[Empty message - Type {msg.get('message_type', '?')}]")
+                        write_line(f"{indent}[{time_part}] {prefix} {sender_prefix}[Empty message - Type {msg.message_type}]")
         
         # Stats
-        output.append("")
-        output.append("=" * 80)
-        #output.append(f"📊 Total messages: {len(messages)}")
-        #output.append("=" * 80)
-        return "\n".join(output)
+        write_line("")
+        buf.write("=" * 80)
+        return buf.getvalue()
     
     def export_conversation(self, contact_name_or_jid, output_file=None, limit=None, recent=False):
         """Export conversation to file."""
@@ -1681,7 +1847,7 @@ def main():
             print(f"❌ Export failed with error: {e}")
         finally:
             # Clean up database connection
-            exporter._close_db_connection()
+            exporter.close()
         return
     
     # Export all contacts and groups
@@ -1725,7 +1891,7 @@ def main():
                 continue
     finally:
         # Always clean up the database connection
-        exporter._close_db_connection()
+        exporter.close()
     
     # Summary
     print("\n" + "=" * 80)
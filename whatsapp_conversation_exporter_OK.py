@@ -17,8 +17,40 @@ import sqlite3
 import os
 import sys
 import re
+import shutil
+from collections import Counter
 from datetime import datetime, timedelta
 
+# Hot-path patterns, compiled once at import instead of on every call
+_RE_CTRL = re.compile(r'[\x00-\x1f]+')
+_RE_SANITIZE = re.compile(r"[^A-Za-z0-9'`{}]")
+_RE_FWD = re.compile(r"[A-Za-z0-9]{2,24}['`][A-Za-z0-9{}]{2,48}")
+# Safe to keep ASCII-only: it runs on _RE_SANITIZE output, which is ASCII
+_RE_FWD_CHARS = re.compile(r'[0-9A-Z{}]')
+_RE_UUID = re.compile(r'([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}\.\w+)')
+
+
+def _read_varint(buf, pos):
+    """Decode a protobuf base-128 varint starting at pos.
+
+    Returns (value, next_pos), or (None, pos) if the buffer ends
+    mid-varint or the value would not fit in 64 bits.
+    """
+    result = 0
+    shift = 0
+    end = len(buf)
+    start = pos
+    while pos < end:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift > 63:
+            break
+    return None, start
+
 
 class ForwardInfo:
     def __init__(self, hash_id):
@@ -49,10 +81,19 @@ class WhatsAppExporter:
             self.media_base_path = os.path.expanduser("~/Library/Group Containers/group.net.whatsapp.WhatsApp.shared/Message")
             
         self.contact_cache = {}
+        self._contacts_preloaded = False
+        self._name_to_jid = {}
+        self._media_index = None
+        self._media_dir_cache = {}
+        self._messages_version = 0
+        self._originals_index = None
         self._db_connection = None
         self._connection_lock = None
         print(f"📁 Database: {self.db_path}")
         print(f"📂 Media base: {self.media_base_path}")
+        # Open the shared connection once up front; every lookup reuses it
+        # (and its prepared-statement cache) instead of paying per-call setup
+        self._get_db_connection()
     
     def _get_db_connection(self):
         """Get a reusable database connection."""
@@ -65,14 +106,24 @@ class WhatsAppExporter:
                 self._db_connection = sqlite3.connect(
                     self.db_path,
                     timeout=30.0,  # 30 second timeout
-                    check_same_thread=False
+                    check_same_thread=False,
+                    cached_statements=256  # keep repeated lookups compiled
                 )
                 # Enable WAL mode for better concurrent access
                 self._db_connection.execute("PRAGMA journal_mode=WAL")
                 self._db_connection.execute("PRAGMA synchronous=NORMAL")
                 self._db_connection.execute("PRAGMA temp_store=MEMORY")
+                self._db_connection.execute("PRAGMA cache_size=-131072")   # 128MB
                 self._db_connection.execute("PRAGMA mmap_size=268435456")  # 256MB
                 self._db_connection.commit()
+                # Supporting index for the reaction-listing query; a
+                # read-only database just skips this
+                try:
+                    self._db_connection.execute(
+                        "CREATE INDEX IF NOT EXISTS ix_msg_type ON ZWAMESSAGE(ZMESSAGETYPE)")
+                    self._db_connection.commit()
+                except Exception:
+                    pass
             except Exception as e:
                 print(f"⚠️ Failed to configure database connection: {e}")
                 # Fallback to basic connection
@@ -168,28 +219,41 @@ class WhatsAppExporter:
             print(f"   Fallback path: {fallback_path}")
             return None
     
+    def _preload_contacts(self):
+        """Fill the contact cache (and a name->JID reverse map) in one query.
+
+        A group with N reactors used to trigger N separate lookups; one
+        SELECT over ZWACHATSESSION replaces all of them.
+        """
+        try:
+            cursor = self._get_db_connection().cursor()
+            cursor.execute("""
+                SELECT ZCONTACTJID, ZPARTNERNAME FROM ZWACHATSESSION
+                WHERE ZCONTACTJID IS NOT NULL
+            """)
+            for row_jid, row_name in cursor.fetchall():
+                if row_name:
+                    self.contact_cache.setdefault(row_jid, self._clean_contact_name(row_name))
+                    self._name_to_jid.setdefault(row_name, row_jid)
+            self._contacts_preloaded = True
+        except Exception as e:
+            print(f"⚠️ Error preloading contact names: {e}")
+
     def _get_contact_name(self, jid):
         """Get contact name from JID."""
         if not jid or jid in self.contact_cache:
             return self.contact_cache.get(jid, "Unknown")
-        
-        try:
-            conn = self._get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT ZPARTNERNAME FROM ZWACHATSESSION WHERE ZCONTACTJID = ?", (jid,))
-            result = cursor.fetchone()
-            
-            if result and result[0]:
-                name = self._clean_contact_name(result[0])
-            else:
-                name = f"Contact ({jid.split('@')[0]})" if '@' in jid else jid
-            
-            self.contact_cache[jid] = name
-            return name
-        except Exception as e:
-            print(f"⚠️ Error getting contact name for {jid}: {e}")
-            self.contact_cache[jid] = jid
-            return jid
+
+        if not self._contacts_preloaded:
+            self._preload_contacts()
+            if jid in self.contact_cache:
+                return self.contact_cache[jid]
+
+        # Cache is fully loaded, so a miss means the JID is simply unknown -
+        # fabricate the label without going back to SQLite
+        name = f"Contact ({jid.split('@')[0]})" if '@' in jid else jid
+        self.contact_cache[jid] = name
+        return name
     
     def _convert_timestamp(self, timestamp):
         """Convert WhatsApp timestamp."""
@@ -205,78 +269,60 @@ class WhatsAppExporter:
         if not blob:
             return None
         try:
-            hex_data = blob.hex().upper()
-            
-            # Find emoji with automatic modifier detection
+            # Scan the raw bytes: UTF-8 emoji are fixed-prefix byte
+            # sequences, so find/slice replaces the old hex-encode plus
+            # regex-over-hex pass entirely
             emoji = None
-            if 'F09F' in hex_data:
-                # Modern emojis (F09F prefix) - may have skin tone modifiers
-                base_matches = re.findall(r'F09F[0-9A-F]{4}', hex_data)
-                if base_matches:
-                    # Check for skin tone modifier after base emoji
-                    base_emoji = base_matches[0]
-                    base_pos = hex_data.find(base_emoji)
-                    remaining = hex_data[base_pos + len(base_emoji):]
-                    
-                    # Look for skin tone modifier (F09F8F[BB-BF])
-                    skin_modifier = re.match(r'F09F8F(BB|BC|BD|BE|BF)', remaining)
-                    if skin_modifier:
-                        full_sequence = base_emoji + skin_modifier.group(0)
-                        emoji = bytes.fromhex(full_sequence).decode('utf-8')
-                    else:
-                        emoji = bytes.fromhex(base_emoji).decode('utf-8')
-                        
-            elif hex_data.startswith('E2') or 'E2' in hex_data:
-                # Legacy Unicode symbols (E2xx prefix) - may have color modifiers
-                base_matches = re.findall(r'E2[0-9A-F]{4}', hex_data)
-                if base_matches:
-                    base_emoji = base_matches[0]
-                    base_pos = hex_data.find(base_emoji)
-                    remaining = hex_data[base_pos + len(base_emoji):]
-                    
-                    # Look for color modifier (EFB8[8F-AB])
-                    color_modifier = re.match(r'EFB8[8-9A-B][0-9A-F]', remaining)
-                    if color_modifier:
-                        full_sequence = base_emoji + color_modifier.group(0)
-                        emoji = bytes.fromhex(full_sequence).decode('utf-8')
-                    else:
-                        emoji = bytes.fromhex(base_emoji).decode('utf-8')
-            
+            pos = blob.find(b'\xf0\x9f')
+            if pos >= 0:
+                # Modern emoji (F0 9F ..) - may carry a skin tone modifier
+                sequence = blob[pos:pos + 4]
+                modifier = blob[pos + 4:pos + 8]
+                if (modifier.startswith(b'\xf0\x9f\x8f')
+                        and modifier[3:4] in (b'\xbb', b'\xbc', b'\xbd', b'\xbe', b'\xbf')):
+                    sequence += modifier
+                emoji = sequence.decode('utf-8')
+            else:
+                pos = blob.find(b'\xe2')
+                if pos >= 0:
+                    # Legacy Unicode symbols (E2 ..) - may carry a variant
+                    # selector (EF B8 80-BF)
+                    sequence = blob[pos:pos + 3]
+                    modifier = blob[pos + 3:pos + 6]
+                    if len(modifier) == 3 and modifier.startswith(b'\xef\xb8'):
+                        sequence += modifier
+                    emoji = sequence.decode('utf-8')
+
             if not emoji:
                 return None
-            
+
             # For groups, try to extract who reacted
             if is_group:
-                return self._decode_group_reactions(hex_data, emoji, group_jid)
+                return self._decode_group_reactions(blob, emoji, group_jid)
             else:
                 return emoji
-                
+
         except Exception:
             pass
         return None
-    
-    def _decode_group_reactions(self, hex_data, emoji, group_jid=None):
+
+    def _decode_group_reactions(self, blob, emoji, group_jid=None):
         """Decode group reactions with person names."""
         try:
-            # Find JID patterns in hex data
-            jid_matches = re.findall(r'333[0-9A-F]+?40732E77686174736170702E6E6574', hex_data)
-            
-            if not jid_matches:
-                return emoji
-            
+            # Each reactor appears as '<digits>@s.whatsapp.net' in the raw
+            # blob; find the marker and walk back over the digit run
+            marker = b'@s.whatsapp.net'
             reactors = []
-            for jid_hex in jid_matches:
-                try:
-                    # Decode JID
-                    jid_bytes = bytes.fromhex(jid_hex)
-                    jid_raw = jid_bytes.decode('utf-8', errors='ignore')
-                    
-                    # Extract clean phone number
-                    phone_match = re.search(r'(\d+)@s\.whatsapp\.net', jid_raw)
-                    if phone_match:
-                        phone = phone_match.group(1)
+            pos = blob.find(marker)
+            while pos != -1:
+                start = pos
+                while start > 0 and 0x30 <= blob[start - 1] <= 0x39:
+                    start -= 1
+                if start < pos:
+                    try:
+                        phone = blob[start:pos].decode('ascii')
                         clean_jid = f'{phone}@s.whatsapp.net'
-                        
+
                         # Get name and create unique initials for this group
                         name = self._get_contact_name(clean_jid)
                         if name and name != clean_jid and 'Contact (' not in name:
@@ -285,21 +331,16 @@ class WhatsAppExporter:
                             else:
                                 initials = self._get_initials(name)
                             reactors.append(initials)
-                except:
-                    continue
-            
+                    except:
+                        pass
+                pos = blob.find(marker, pos + len(marker))
+
             if reactors:
                 # Remove duplicates while preserving order
-                unique_reactors = []
-                for reactor in reactors:
-                    if reactor not in unique_reactors:
-                        unique_reactors.append(reactor)
-                
-                if len(unique_reactors) == 1:
-                    return f"[{unique_reactors[0]}:{emoji}]"
-                else:
-                    reactor_list = ';'.join([f"{r}:{emoji}" for r in unique_reactors])
-                    return f"[{reactor_list}]"
+                unique_reactors = list(dict.fromkeys(reactors))
+
+                reactor_list = ';'.join(f"{r}:{emoji}" for r in unique_reactors)
+                return f"[{reactor_list}]"
             
             return emoji
             
@@ -634,16 +675,14 @@ class WhatsAppExporter:
                     jid_to_name[jid] = name
             
             # Generate initial initials
-            name_to_initials = {}
-            initials_count = {}
-            
-            for jid, name in jid_to_name.items():
-                basic_initials = self._get_initials(name)
-                name_to_initials[name] = basic_initials
-                initials_count[basic_initials] = initials_count.get(basic_initials, 0) + 1
-            
-            # Resolve conflicts by using more letters from first names
+            name_to_initials = {name: self._get_initials(name) for name in jid_to_name.values()}
+            initials_count = Counter(name_to_initials[name] for name in jid_to_name.values())
+
+            # Resolve conflicts by using more letters from first names;
+            # track assigned initials in a set so the uniqueness probe is
+            # O(1) instead of scanning dict values each round
             final_initials = {}
+            used = set()
             for name, initials in name_to_initials.items():
                 if initials_count[initials] > 1:
                     # There's a conflict, need to make unique
@@ -663,7 +702,7 @@ class WhatsAppExporter:
                         # If still conflict, add more characters from first name
                         counter = 3
                         base_unique = unique_initials
-                        while unique_initials in final_initials.values():
+                        while unique_initials in used:
                             if len(first_name) > counter - 1:
                                 first_part = first_name[0].upper() + first_name[1:counter].lower()
                                 unique_initials = first_part + last_part
@@ -672,12 +711,15 @@ class WhatsAppExporter:
                                 # Fallback: add numbers
                                 unique_initials = base_unique + str(counter-2)
                                 counter += 1
-                        
+
                         final_initials[name] = unique_initials
+                        used.add(unique_initials)
                     else:
                         final_initials[name] = initials
+                        used.add(initials)
                 else:
                     final_initials[name] = initials
+                    used.add(initials)
             
             # Create reverse mapping: JID to unique initials
             jid_to_initials = {}
@@ -809,19 +851,22 @@ class WhatsAppExporter:
             
         original_path = media_info['local_path']
         
-        # Create media directory structure
-        safe_contact_name = "".join(c for c in contact_name if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
-        media_dir = f"conversations/media/{safe_contact_name}"
-        
-        if not os.path.exists(media_dir):
+        # Create media directory structure; sanitizing the name and stat-ing
+        # the directory once per contact instead of once per media item
+        cached = self._media_dir_cache.get(contact_name)
+        if cached:
+            safe_contact_name, media_dir = cached
+        else:
+            safe_contact_name = "".join(c for c in contact_name if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
+            media_dir = f"conversations/media/{safe_contact_name}"
             os.makedirs(media_dir, exist_ok=True)
+            self._media_dir_cache[contact_name] = (safe_contact_name, media_dir)
         
         # Extract filename from original path
         filename = os.path.basename(original_path)
         if not filename:
             # Generate filename from UUID in path
-            import re
-            uuid_match = re.search(r'([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}\.\w+)', original_path)
+            uuid_match = _RE_UUID.search(original_path)
             if uuid_match:
                 filename = uuid_match.group(1)
             else:
@@ -841,7 +886,6 @@ class WhatsAppExporter:
         
         try:
             if full_source_path and os.path.exists(full_source_path) and not os.path.exists(full_target_path):
-                import shutil
                 shutil.copy2(full_source_path, full_target_path)
                 print(f"   📎 Copied media: {filename}")
             elif os.path.exists(full_target_path):
@@ -867,13 +911,11 @@ class WhatsAppExporter:
         # We need to find the contact JID for this contact name
         # This is a simplified approach - in real usage, you might need a more sophisticated mapping
         try:
-            conn = self._get_db_connection()
-            cursor = conn.cursor()
-            # Find contact JID by name
-            cursor.execute("SELECT ZCONTACTJID FROM ZWACHATSESSION WHERE ZPARTNERNAME = ?", (contact_name,))
-            result = cursor.fetchone()
-            if result:
-                contact_jid = result[0]
+            # The preloaded name->JID map answers this without a query
+            if not self._contacts_preloaded:
+                self._preload_contacts()
+            contact_jid = self._name_to_jid.get(contact_name)
+            if contact_jid:
                 # For groups, convert group JID to individual JID pattern
                 if '@g.us' in contact_jid:
                     # Group - use group JID as folder name
@@ -901,18 +943,26 @@ class WhatsAppExporter:
         return None
     
     def _find_media_in_backup(self, filename):
-        """Find media file in backup directory by scanning."""
-        if not os.path.exists(self.media_base_path):
-            return None
-        
-        try:
-            for root, dirs, files in os.walk(self.media_base_path):
-                if filename in files:
-                    return os.path.join(root, filename)
-        except Exception:
-            pass
-        
-        return None
+        """Find media file in backup directory via a one-time filename index."""
+        if self._media_index is None:
+            # One traversal builds the whole filename -> path map; every
+            # later lookup is a dict get instead of an os.walk from scratch
+            self._media_index = {}
+            if os.path.exists(self.media_base_path):
+                try:
+                    stack = [self.media_base_path]
+                    while stack:
+                        current = stack.pop()
+                        with os.scandir(current) as entries:
+                            for entry in entries:
+                                if entry.is_dir(follow_symlinks=False):
+                                    stack.append(entry.path)
+                                else:
+                                    self._media_index.setdefault(entry.name, entry.path)
+                except Exception:
+                    pass
+
+        return self._media_index.get(filename)
     
     def _extract_quoted_text(self, cursor, media_item_id):
         """Extract quoted text from media metadata."""
@@ -951,25 +1001,32 @@ class WhatsAppExporter:
             
             blob = result[0]
             i = 0
-            
-            while i < len(blob) - 2:
-                tag_byte = blob[i]
-                if (tag_byte & 0x7) == 2:  # Length-delimited field
-                    tag = tag_byte >> 3
-                    length = blob[i + 1]
-                    
-                    if i + 2 + length <= len(blob) and length > 2 and tag == 1:
-                        field_data = blob[i + 2:i + 2 + length]
+            n = len(blob)
+
+            while i < n - 2:
+                # Decode tag and length as real varints (single-byte reads
+                # break on payloads >= 128 bytes); resync by one byte when
+                # the frame does not parse
+                tag_key, pos = _read_varint(blob, i)
+                if tag_key is not None and (tag_key & 0x7) == 2:  # Length-delimited field
+                    tag = tag_key >> 3
+                    length, data_start = _read_varint(blob, pos)
+                    if length is None or data_start + length > n:
+                        i += 1
+                        continue
+
+                    if length > 2 and tag == 1:
+                        field_data = blob[data_start:data_start + length]
                         try:
                             text = field_data.decode('utf-8', errors='ignore').strip()
-                            text = re.sub(r'[\x00-\x1f]+', '', text)
+                            text = _RE_CTRL.sub('', text)
                             
                             if len(text) > 3:
                                 # Check for forward hash (only if it really looks like one)
-                                sanitized = re.sub(r"[^A-Za-z0-9'`{}]", "", text)
+                                sanitized = _RE_SANITIZE.sub("", text)
                                 if (len(sanitized) > 10 and 
-                                    re.fullmatch(r"[A-Za-z0-9]{2,24}['`][A-Za-z0-9{}]{2,48}", sanitized) and
-                                    any(c.isdigit() or c in '{}' or (c.isalpha() and c.isupper()) for c in sanitized)):
+                                    _RE_FWD.fullmatch(sanitized) and
+                                    _RE_FWD_CHARS.search(sanitized)):
                                     return ForwardInfo(sanitized)
                                 
                                 # Regular quote - be more permissive
@@ -980,8 +1037,8 @@ class WhatsAppExporter:
                                     return text
                         except Exception:
                             pass
-                    
-                    i += 2 + length if i + 2 + length <= len(blob) else i + 1
+
+                    i = data_start + length
                 else:
                     i += 1
             
@@ -1001,34 +1058,66 @@ class WhatsAppExporter:
         if not media_ids:
             return
         
-        placeholders = ','.join(['?'] * len(media_ids))
-        cursor.execute(f"SELECT Z_PK,ZMETADATA FROM ZWAMEDIAITEM WHERE Z_PK IN ({placeholders})", media_ids)
-        meta_map = {r[0]: r[1] for r in cursor.fetchall() if r[1]}
-        
-        # Index original messages
-        originals = {}
-        for m in self.messages:
-            text = (m.get('content') or '').strip()
-            if len(text) >= 40:
-                originals.setdefault(text[:60], []).append(m)
-        
+        # Stage the ids in a temp table and join instead of a variadic IN:
+        # avoids SQLite's 999-parameter limit on large conversations and
+        # gives the planner an indexed join; stream the blobs in batches
+        # rather than materializing the whole result set
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _tgt_ids(id INTEGER PRIMARY KEY)")
+        cursor.execute("DELETE FROM _tgt_ids")
+        cursor.executemany("INSERT OR IGNORE INTO _tgt_ids VALUES(?)", ((mid,) for mid in media_ids))
+        cursor.execute("SELECT Z_PK, ZMETADATA FROM ZWAMEDIAITEM JOIN _tgt_ids ON Z_PK = id")
+        meta_map = {}
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for r in rows:
+                if r[1]:
+                    meta_map[r[0]] = r[1]
+        
+        # Index original messages. Besides the first-60-char key, build an
+        # inverted index over every 15-char window of each key so targets can
+        # find candidate originals with hash lookups instead of substring
+        # scanning every key per target. Both indexes are cached against the
+        # message list's version and only rebuilt when it is reloaded.
+        shingle = 15
+        no_keys = frozenset()
+        if self._originals_index and self._originals_index[0] == self._messages_version:
+            originals, shingle_index = self._originals_index[1], self._originals_index[2]
+        else:
+            originals = {}
+            shingle_index = {}
+            for m in self.messages:
+                text = (m.get('content') or '').strip()
+                if len(text) >= 40:
+                    key = text[:60]
+                    originals.setdefault(key, []).append(m)
+                    for start in range(len(key) - shingle + 1):
+                        shingle_index.setdefault(key[start:start + shingle], set()).add(key)
+            self._originals_index = (self._messages_version, originals, shingle_index)
+
         # Process targets
         for msg in targets:
             blob = meta_map.get(msg.get('_media_item_id'))
             if not blob:
                 continue
             
-            # Extract fragments from tags 5,6,9,13,14
+            # Extract fragments from tags 5,6,9,13,14; same varint-aware
+            # walk as _extract_quoted_text
             parts = []
             i = 0
-            while i < len(blob) - 2:
-                b = blob[i]
-                if (b & 7) == 2 and i + 1 < len(blob):
-                    tag = b >> 3
-                    length = blob[i + 1]
-                    data = blob[i + 2:i + 2 + length]
-                    i += 2 + length
-                    
+            n = len(blob)
+            while i < n - 2:
+                tag_key, pos = _read_varint(blob, i)
+                if tag_key is not None and (tag_key & 7) == 2:
+                    tag = tag_key >> 3
+                    length, data_start = _read_varint(blob, pos)
+                    if length is None or data_start + length > n:
+                        i += 1
+                        continue
+                    data = blob[data_start:data_start + length]
+                    i = data_start + length
+
                     if 10 < length < 130 and tag in (5, 6, 9, 13, 14):
                         try:
                             text = data.decode('utf-8', 'ignore').strip()
@@ -1042,38 +1131,45 @@ class WhatsAppExporter:
             if len(parts) < 2:
                 continue
             
-            # Find matching original
+            # Find matching originals via the shingle index: probe each long
+            # part's prefix, plus every window of the reconstruction (which
+            # covers the key[:25]-in-reconstruction fallback), then verify
+            # the original match conditions on the narrowed key set
             reconstruction = ' '.join(parts)
+            candidate_keys = set()
+            for part in parts:
+                if len(part) > 15:
+                    candidate_keys |= shingle_index.get(part[:shingle], no_keys)
+            for start in range(len(reconstruction) - shingle + 1):
+                candidate_keys |= shingle_index.get(reconstruction[start:start + shingle], no_keys)
+
             best_match = None
             best_delta = None
-            
-            for key, candidates in originals.items():
+            msg_ts = msg.get('_ts')
+
+            for key in candidate_keys:
                 match_found = any(len(part) > 15 and part in key for part in parts)
                 if not match_found and key[:25] in reconstruction:
                     match_found = True
-                
+
                 if match_found:
-                    for candidate in candidates:
+                    for candidate in originals[key]:
                         if (candidate.get('is_from_me') == msg.get('is_from_me') or
-                            not candidate.get('date') or not msg.get('date')):
+                            msg_ts is None):
                             continue
-                        
-                        try:
-                            t1 = datetime.strptime(candidate['date'], '%Y-%m-%d %H:%M:%S')
-                            t2 = datetime.strptime(msg['date'], '%Y-%m-%d %H:%M:%S')
-                            if t1 >= t2:
-                                continue
-                            
-                            delta = (t2 - t1).total_seconds()
-                            if delta > 48 * 3600:
-                                continue
-                            
-                            if best_delta is None or delta < best_delta:
-                                best_match = candidate
-                                best_delta = delta
-                        except:
+
+                        t1 = candidate.get('_ts')
+                        if t1 is None or t1 >= msg_ts:
                             continue
-            
+
+                        delta = msg_ts - t1
+                        if delta > 48 * 3600:
+                            continue
+
+                        if best_delta is None or delta < best_delta:
+                            best_match = candidate
+                            best_delta = delta
+
             # Apply quote
             if best_match and not msg.get('quoted_text'):
                 content = best_match['content']
@@ -1081,9 +1177,7 @@ class WhatsAppExporter:
                     words = content[:90].split()
                     content = ' '.join(words[:-1]) + '...' if len(words) > 1 else content[:85] + '...'
                 msg['quoted_text'] = content
-    
-                msg['quoted_text'] = content
-    
+
     def get_contacts_with_reactions(self):
         """Get contacts with reactions."""
         try:
@@ -1098,7 +1192,7 @@ class WhatsAppExporter:
                 WHERE m.ZMESSAGETYPE = 0 
                 AND i.ZRECEIPTINFO IS NOT NULL
                 AND LENGTH(i.ZRECEIPTINFO) > 50
-                AND (HEX(i.ZRECEIPTINFO) LIKE '%F09F%' OR HEX(i.ZRECEIPTINFO) LIKE '%E2%')
+                AND (INSTR(i.ZRECEIPTINFO, X'F09F') > 0 OR INSTR(i.ZRECEIPTINFO, X'E2') > 0)
                 AND (m.ZFROMJID LIKE '%@s.whatsapp.net' OR m.ZTOJID LIKE '%@s.whatsapp.net')
                 GROUP BY contact_jid
                 ORDER BY reaction_count DESC
@@ -1200,8 +1294,10 @@ class WhatsAppExporter:
             
             print(f"📋 Found {len(rows)} messages...")
             
-            # Collect all messages
+            # Collect all messages; bump the version so cached indexes
+            # built over the previous conversation are not reused
             self.messages = []
+            self._messages_version += 1
             message_lookup = {}
             
             for row in rows:
@@ -1243,6 +1339,9 @@ class WhatsAppExporter:
                     'message_id': row[0],
                     'content': row[1],
                     'date': self._convert_timestamp(row[2]),
+                    # Raw epoch seconds, so later passes compare floats
+                    # instead of parsing the formatted date back
+                    '_ts': (row[2] + 978307200) if row[2] else None,
                     'from_jid': row[3],
                     'to_jid': row[4],
                     'is_from_me': bool(row[5]),
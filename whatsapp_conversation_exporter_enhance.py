@@ -14,12 +14,38 @@ Date: August 2025
 """
 
 import sqlite3
+import argparse
+import io
 import os
 import sys
 import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 
+class _SafeNameTable(dict):
+    """Lazily-populated str.translate table for filename sanitization.
+
+    Alphanumerics (Unicode-aware, matching str.isalnum) map to
+    themselves and everything else is dropped; each codepoint is
+    classified once and cached.
+    """
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        mapped = char if char.isalnum() else None
+        self[codepoint] = mapped
+        return mapped
+
+
+# Sanitization and space-to-underscore in one C-level translate pass:
+# alphanumerics map to themselves, spaces become underscores, dashes
+# and underscores pass through and everything else is dropped
+_SAFE_NAME_TABLE = _SafeNameTable({ord(' '): '_', ord('-'): '-', ord('_'): '_'})
+
+
 class ForwardInfo:
     def __init__(self, hash_id):
         self.hash_id = hash_id
@@ -45,6 +71,12 @@ class WhatsAppExporter:
             self.media_base_path = os.path.expanduser("~/Library/Group Containers/group.net.whatsapp.WhatsApp.shared/Message")
             
         self.contact_cache = {}
+        self._contact_index = {}
+        self._contacts_cache = None
+        self._reaction_contacts_cache = None
+        # Create the output directory once here instead of stat'ing it on
+        # every export_conversation call
+        os.makedirs("conversations", exist_ok=True)
         print(f"📁 Database: {self.db_path}")
         print(f"📂 Media base: {self.media_base_path}")
     
@@ -254,12 +286,12 @@ class WhatsAppExporter:
                 
                 # Generate initial initials
                 name_to_initials = {}
-                initials_count = {}
-                
+                initials_count = Counter()
+
                 for jid, name in jid_to_name.items():
                     basic_initials = self._get_initials(name)
                     name_to_initials[name] = basic_initials
-                    initials_count[basic_initials] = initials_count.get(basic_initials, 0) + 1
+                    initials_count[basic_initials] += 1
                 
                 # Resolve conflicts by using more letters from first names
                 final_initials = {}
@@ -342,7 +374,7 @@ class WhatsAppExporter:
         original_path = media_info['local_path']
         
         # Create media directory structure
-        safe_contact_name = "".join(c for c in contact_name if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
+        safe_contact_name = contact_name.translate(_SAFE_NAME_TABLE).strip('_')
         media_dir = f"conversations/media/{safe_contact_name}"
         
         if not os.path.exists(media_dir):
@@ -618,6 +650,8 @@ class WhatsAppExporter:
     
     def get_contacts_with_reactions(self):
         """Get contacts with reactions."""
+        if self._reaction_contacts_cache is not None:
+            return self._reaction_contacts_cache
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
@@ -644,6 +678,7 @@ class WhatsAppExporter:
                             'name': self._get_contact_name(jid),
                             'reaction_count': count
                         })
+                self._reaction_contacts_cache = contacts
                 return contacts
         except Exception as e:
             print(f"❌ Error getting contacts: {e}")
@@ -651,6 +686,10 @@ class WhatsAppExporter:
     
     def get_all_contacts(self):
         """Get all contacts and groups."""
+        # Cached so the per-contact export_conversation calls in main()
+        # don't re-run the query N+1 times during a bulk export
+        if self._contacts_cache is not None:
+            return self._contacts_cache
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
@@ -671,6 +710,14 @@ class WhatsAppExporter:
                             'name': name,
                             'reaction_count': 0  # Default value
                         })
+
+                # Index by lowercased name and by JID for O(1) lookups
+                # instead of a linear scan per export
+                self._contact_index = {}
+                for contact in contacts:
+                    self._contact_index[contact['name'].lower()] = contact
+                    self._contact_index[contact['jid']] = contact
+                self._contacts_cache = contacts
                 return contacts
         except Exception as e:
             print(f"❌ Error getting all contacts: {e}")
@@ -822,23 +869,44 @@ class WhatsAppExporter:
             print(f"❌ Database error: {e}")
             return []
     
-    def format_conversation(self, messages, contact_name):
-        """Format conversation for export."""
+    def format_conversation(self, messages, contact_name, out):
+        """Format conversation and stream it to a binary file-like object.
+
+        Writes each line as it is produced instead of accumulating the whole
+        export in memory; returns the number of bytes written.
+        """
         if not messages:
-            return "No messages found."
-        
-        output = []
-        output.append("=" * 80)
-        output.append(f"WhatsApp Conversation Export")
-        output.append(f"Contact: {contact_name}")
-        output.append(f"Messages: {len(messages)}")
-        output.append(f"Date Range: {messages[0]['date']} to {messages[-1]['date']}")
-        output.append(f"Exported: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        output.append("=" * 80)
-        output.append("")
+            data = b"No messages found."
+            out.write(data)
+            return len(data)
+
+        bytes_written = 0
+
+        def write_line(line):
+            nonlocal bytes_written
+            data = line.encode('utf-8')
+            out.write(data)
+            out.write(b'\n')
+            bytes_written += len(data) + 1
+
+        write_line("=" * 80)
+        write_line(f"WhatsApp Conversation Export")
+        write_line(f"Contact: {contact_name}")
+        write_line(f"Messages: {len(messages)}")
+        write_line(f"Date Range: {messages[0]['date']} to {messages[-1]['date']}")
+        write_line(f"Exported: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        write_line("=" * 80)
+        write_line("")
         
         current_date = None
+        emoji_counts = Counter()
         for msg in messages:
+            # Tally reactions during the formatting pass itself, so the stats
+            # section below never re-walks messages
+            emoji = msg['reaction_emoji']
+            if emoji:
+                emoji_counts[emoji] += 1
+
             message_date = msg['date']
             if not message_date:
                 continue
@@ -848,7 +916,7 @@ class WhatsAppExporter:
                 msg_date_part = message_date.split(' ')[0]
                 if current_date != msg_date_part:
                     current_date = msg_date_part
-                    output.append(f"\n--- {current_date} ---\n")
+                    write_line(f"\n--- {current_date} ---\n")
             except:
                 pass
             
@@ -864,7 +932,11 @@ class WhatsAppExporter:
             sender_prefix = ""
             if msg.get('sender_name') and not msg['is_from_me']:
                 sender_prefix = f"{msg['sender_name']}: "
-            
+
+            # Build the reaction suffix once so every branch below emits its
+            # line with a single f-string instead of a conditional +=
+            reaction_suffix = f" {emoji}" if emoji else ""
+
             # Handle quoted messages
             if msg.get('quoted_text'):
                 citation = msg.get('quoted_text')
@@ -876,7 +948,7 @@ class WhatsAppExporter:
                     lines = citation.split('\n')
                     citation_line = f"[{time_part}] ↳ {lines[0]}"
                     
-                output.append(citation_line)
+                write_line(citation_line)
                 
                 # Add additional citation lines if multi-line
                 if not isinstance(citation, ForwardInfo):
@@ -884,7 +956,7 @@ class WhatsAppExporter:
                     if len(lines) > 1:
                         for extra in lines[1:]:
                             # Indent to align with the arrow
-                            output.append(f"           {extra}")
+                            write_line(f"           {extra}")
                 
                 # Handle media in quoted messages
                 if msg.get('media_info'):
@@ -905,15 +977,12 @@ class WhatsAppExporter:
                         media_line += f" ({size_kb} KB)"
                     if msg['media_info'].get('title'):
                         media_line += f" - {msg['media_info']['title']}"
-                    output.append(media_line)
+                    write_line(media_line)
                 
                 # Add the reply message below with proper indentation and sender prefix
                 reply_content = msg['content'] or ''
                 if reply_content.strip():
-                    message_line = f"           {prefix} {sender_prefix}{reply_content}"
-                    if msg['reaction_emoji']:
-                        message_line += f" {msg['reaction_emoji']}"
-                    output.append(message_line)
+                    write_line(f"           {prefix} {sender_prefix}{reply_content}{reaction_suffix}")
             else:
                 # Regular message - handle media first, then text
                 if msg.get('media_info'):
@@ -937,11 +1006,9 @@ class WhatsAppExporter:
                         message_line += f" ({size_kb} KB)"
                     if msg['media_info'].get('title'):
                         message_line += f" - {msg['media_info']['title']}"
-                    if msg['reaction_emoji']:
-                        message_line += f" {msg['reaction_emoji']}"
-                    
-                    output.append(message_line)
-                    
+
+                    write_line(message_line + reaction_suffix)
+
                     # Add content as separate comment line if it exists
                     content = msg['content'] or ''
                     if msg.get('is_forwarded'):
@@ -949,67 +1016,59 @@ class WhatsAppExporter:
                     
                     if content.strip():
                         comment_line = f"    💬 {content}"
-                        output.append(comment_line)
+                        write_line(comment_line)
                         
                 elif msg['content'] and msg['content'].strip():
                     # Text-only message (no media)
                     content = msg['content']
                     if msg.get('is_forwarded'):
                         content = f"(forward) {content}"
-                    message_line = f"[{time_part}] {prefix} {sender_prefix}{content}"
-                    if msg['reaction_emoji']:
-                        message_line += f" {msg['reaction_emoji']}"
-                    output.append(message_line)
+                    write_line(f"[{time_part}] {prefix} {sender_prefix}{content}{reaction_suffix}")
                 else:
                     # This should never happen - warn about completely empty messages
                     if not msg.get('media_info') and not (msg['content'] and msg['content'].strip()):
                         print(f"⚠️ Warning: Empty message found (ID: {msg.get('message_id')}, Type: {msg.get('message_type')})")
                         # Still show it with a placeholder to avoid losing data
-                        output.append(f"[{time_part}] {prefix} {sender_prefix}[Empty message - Type {msg.get('message_type', '?')}]")
-        
-        # Stats
-        output.append("")
-        output.append("=" * 80)
-        reaction_count = sum(1 for msg in messages if msg['reaction_emoji'])
-        output.append(f"📊 Total messages: {len(messages)}")
-        output.append(f"🎯 Messages with reactions: {reaction_count}")
+                        write_line(f"[{time_part}] {prefix} {sender_prefix}[Empty message - Type {msg.get('message_type', '?')}]")
         
+        # Stats - emoji_counts was filled during the formatting loop above
+        write_line("")
+        write_line("=" * 80)
+        reaction_count = sum(emoji_counts.values())
+        write_line(f"📊 Total messages: {len(messages)}")
+        write_line(f"🎯 Messages with reactions: {reaction_count}")
+
         if reaction_count > 0:
-            emoji_counts = {}
-            for msg in messages:
-                if msg['reaction_emoji']:
-                    emoji = msg['reaction_emoji']
-                    emoji_counts[emoji] = emoji_counts.get(emoji, 0) + 1
-            
-            output.append(f"😊 Unique emoji types: {len(emoji_counts)}")
-            output.append("\nReaction breakdown:")
-            for emoji, count in sorted(emoji_counts.items(), key=lambda x: x[1], reverse=True):
+            write_line(f"😊 Unique emoji types: {len(emoji_counts)}")
+            write_line("\nReaction breakdown:")
+            for emoji, count in emoji_counts.most_common():
                 percentage = (count / reaction_count) * 100
-                output.append(f"  {emoji}: {count} times ({percentage:.1f}%)")
+                write_line(f"  {emoji}: {count} times ({percentage:.1f}%)")
         
-        output.append("=" * 80)
-        return "\n".join(output)
+        # The final rule carries no trailing newline, matching the old
+        # "\n".join() output byte for byte
+        data = ("=" * 80).encode('utf-8')
+        out.write(data)
+        return bytes_written + len(data)
     
-    def export_conversation(self, contact_name_or_jid, output_file=None, limit=None, recent=False):
-        """Export conversation to file."""
+    def export_conversation(self, contact_name_or_jid, output_file=None, limit=None, recent=False,
+                            run_timestamp=None):
+        """Export conversation to file.
+
+        run_timestamp lets a bulk export share one filename timestamp across
+        all contacts instead of calling strftime per contact - which could
+        also collide within the same second under parallel export.
+        """
         print(f"🔍 Looking for contact: {contact_name_or_jid}")
-        
-        # Create directory
+
+        # Output directory is created once in __init__
         conversations_dir = "conversations"
-        if not os.path.exists(conversations_dir):
-            os.makedirs(conversations_dir)
-            print(f"📁 Created directory: {conversations_dir}")
-        
-        # Find contact
-        contacts = self.get_all_contacts()
-        target_contact = None
-        
-        for contact in contacts:
-            if (contact['name'].lower() == contact_name_or_jid.lower() or 
-                contact['jid'] == contact_name_or_jid):
-                target_contact = contact
-                break
-        
+
+        # Find contact via the name/JID index built by get_all_contacts
+        self.get_all_contacts()
+        target_contact = (self._contact_index.get(contact_name_or_jid.lower())
+                          or self._contact_index.get(contact_name_or_jid))
+
         if not target_contact:
             print(f"❌ Contact '{contact_name_or_jid}' not found.")
             print("Available contacts with reactions:")
@@ -1029,25 +1088,24 @@ class WhatsAppExporter:
         
         # Generate filename
         if not output_file:
-            safe_name = "".join(c for c in target_contact['name'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            safe_name = safe_name.replace(' ', '_')
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            safe_name = target_contact['name'].translate(_SAFE_NAME_TABLE).rstrip('_')
+            timestamp = run_timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
             suffix = "_recent" if recent else ""
             output_file = os.path.join(conversations_dir, f"whatsapp_conversation_{safe_name}{suffix}_{timestamp}.md")
         else:
             output_file = os.path.join(conversations_dir, os.path.basename(output_file))
         
-        # Export
-        formatted_text = self.format_conversation(messages, target_contact['name'])
-        
+        # Export - stream lines straight into the buffered file, so no
+        # monolithic joined string is ever held in memory
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(formatted_text)
-            
+            with open(output_file, 'wb', buffering=1024 * 1024) as f:
+                bytes_written = self.format_conversation(messages, target_contact['name'], f)
+
             print(f"✅ Conversation exported to: {output_file}")
-            print(f"📄 File size: {os.path.getsize(output_file)} bytes")
-            return output_file
-            
+            print(f"📄 File size: {bytes_written} bytes")
+            # Report the size we just wrote so callers don't have to stat()
+            return output_file, bytes_written
+
         except Exception as e:
             print(f"❌ Error writing file: {e}")
             return None
@@ -1060,6 +1118,8 @@ def main():
     print("📝 Export conversations with citations, forwards, and reactions")
     print()
     
+    only_with_reactions = False
+
     # If no arguments provided, run interactive mode
     if len(sys.argv) == 1:
         print("🔧 INTERACTIVE MODE")
@@ -1123,36 +1183,22 @@ def main():
         print("=" * 40)
     else:
         # Parse command line arguments
-        contact_name = None
-        limit = None
-        recent = False
-        backup_mode = False
-        backup_path = None
-        
-        i = 1
-        while i < len(sys.argv):
-            if sys.argv[i] == "--contact" and i + 1 < len(sys.argv):
-                contact_name = sys.argv[i + 1]
-                i += 2
-            elif sys.argv[i] == "--limit" and i + 1 < len(sys.argv):
-                limit = int(sys.argv[i + 1])
-                i += 2
-            elif sys.argv[i] == "--recent":
-                recent = True
-                i += 1
-            elif sys.argv[i] == "--backup":
-                backup_mode = True
-                i += 1
-            elif sys.argv[i] == "--backup-path" and i + 1 < len(sys.argv):
-                backup_path = sys.argv[i + 1]
-                backup_mode = True
-                i += 2
-            else:
-                print(f"❌ Unknown argument: {sys.argv[i]}")
-                print("💡 Usage: python script.py [--contact 'Name'] [--limit 100] [--recent] [--backup] [--backup-path 'path']")
-                print("   --backup: Use wtsexporter backup instead of local WhatsApp")
-                print("   --backup-path: Path to wtsexporter output directory (default: ../working_wts)")
-                return
+        parser = argparse.ArgumentParser(description='Export WhatsApp conversations')
+        parser.add_argument('--contact', help='Specific contact name to export')
+        parser.add_argument('--limit', type=int, help='Limit number of messages per conversation')
+        parser.add_argument('--recent', action='store_true', help='Get most recent messages instead of oldest')
+        parser.add_argument('--backup', action='store_true', help='Use wtsexporter backup instead of local WhatsApp')
+        parser.add_argument('--backup-path', help='Path to wtsexporter output directory (default: ../working_wts)')
+        parser.add_argument('--only-with-reactions', action='store_true',
+                            help='Skip contacts whose conversations have no reactions')
+        args = parser.parse_args()
+
+        contact_name = args.contact
+        limit = args.limit
+        recent = args.recent
+        backup_path = args.backup_path
+        backup_mode = args.backup or backup_path is not None
+        only_with_reactions = args.only_with_reactions
     
     # Display mode information
     if backup_mode:
@@ -1174,10 +1220,11 @@ def main():
         if recent:
             print("📅 Showing recent messages first")
         result = exporter.export_conversation(contact_name, None, limit, recent)
-        
+
         if result:
+            filepath, _ = result
             print(f"\n🎉 Export successful!")
-            print(f"📁 File: {result}")
+            print(f"📁 File: {filepath}")
         else:
             print("❌ Export failed")
         return
@@ -1189,50 +1236,101 @@ def main():
     if not contacts:
         print("❌ No contacts found.")
         return
-    
+
     print(f"📊 Found {len(contacts)} contacts and groups")
+
+    if only_with_reactions:
+        # get_all_contacts doesn't know reaction counts, so pull them once
+        # and drop contacts with none - skipping a contact avoids its whole
+        # conversation query and file write
+        counts = {c['jid']: c['reaction_count'] for c in exporter.get_contacts_with_reactions()}
+        for contact in contacts:
+            contact['reaction_count'] = counts.get(contact['jid'], 0)
+        contacts = [c for c in contacts if c['reaction_count'] > 0]
+        print(f"🎯 Keeping {len(contacts)} contacts with reactions")
+
     print("=" * 60)
     
     # Export each contact
     exported_files = []
     total_reactions = 0
-    
-    for i, contact in enumerate(contacts, 1):
-        print(f"\n📝 [{i}/{len(contacts)}] Exporting: {contact['name']}")
-        print(f"   📊 Has {contact['reaction_count']} reaction messages")
-        
-        result = exporter.export_conversation(contact['jid'], None, limit, False)
-        
-        if result:
-            exported_files.append({
-                'contact': contact['name'],
-                'file': result,
-                'size': os.path.getsize(result),
-                'reactions': contact['reaction_count']
-            })
-            total_reactions += contact['reaction_count']
-            print(f"   ✅ Exported to: {os.path.basename(result)}")
-        else:
-            print(f"   ❌ Failed to export {contact['name']}")
-    
-    # Summary
-    print("\n" + "=" * 80)
-    print("🎉 EXPORT SUMMARY")
-    print("=" * 80)
-    print(f"📊 Total contacts processed: {len(contacts)}")
-    print(f"✅ Successfully exported: {len(exported_files)}")
-    print(f"🎯 Total reaction messages: {total_reactions}")
-    
+
+    # The bulk loop prints several lines per contact; route them through an
+    # explicit 64 KiB buffer flushed once per contact, so each contact's
+    # block costs one write() syscall instead of one per print
+    orig_stdout = sys.stdout
+    sys.stdout = io.TextIOWrapper(io.BufferedWriter(orig_stdout.buffer, buffer_size=65536),
+                                  encoding=orig_stdout.encoding, line_buffering=False)
+
+    # Contacts are independent and each export is mostly I/O (DB reads plus
+    # file writes), so fan them out over a thread pool. Every worker thread
+    # keeps its own exporter - and thus its own SQLite connections, which
+    # cannot be shared across threads
+    thread_state = threading.local()
+
+    # One timestamp for the whole run, shared by every exported filename
+    run_ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    def _export_one(jid):
+        worker = getattr(thread_state, 'exporter', None)
+        if worker is None:
+            worker = WhatsAppExporter(backup_mode=backup_mode, backup_base_path=backup_path)
+            thread_state.exporter = worker
+        return worker.export_conversation(jid, None, limit, False, run_timestamp=run_ts)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = {pool.submit(_export_one, c['jid']): c for c in contacts}
+        for i, future in enumerate(as_completed(futures), 1):
+            contact = futures[future]
+            print(f"\n📝 [{i}/{len(contacts)}] Exporting: {contact['name']}")
+            print(f"   📊 Has {contact['reaction_count']} reaction messages")
+
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"   ❌ Error exporting {contact['name']}: {e}")
+                sys.stdout.flush()
+                continue
+
+            if result:
+                filepath, size_bytes = result
+                exported_files.append({
+                    'contact': contact['name'],
+                    'file': filepath,
+                    'size': size_bytes,
+                    'reactions': contact['reaction_count']
+                })
+                total_reactions += contact['reaction_count']
+                print(f"   ✅ Exported to: {os.path.basename(filepath)}")
+            else:
+                print(f"   ❌ Failed to export {contact['name']}")
+            sys.stdout.flush()
+
+    # Unhook the extra buffer without closing the real stdout underneath
+    sys.stdout.flush()
+    sys.stdout.detach().detach()
+    sys.stdout = orig_stdout
+
+    # Summary - collected into one block and emitted with a single write
+    lines = []
+    lines.append("\n" + "=" * 80)
+    lines.append("🎉 EXPORT SUMMARY")
+    lines.append("=" * 80)
+    lines.append(f"📊 Total contacts processed: {len(contacts)}")
+    lines.append(f"✅ Successfully exported: {len(exported_files)}")
+    lines.append(f"🎯 Total reaction messages: {total_reactions}")
+
     total_size = sum(f['size'] for f in exported_files)
-    print(f"📄 Total export size: {total_size:,} bytes ({total_size/1024/1024:.1f} MB)")
-    
-    print(f"\n📁 Exported files:")
+    lines.append(f"📄 Total export size: {total_size:,} bytes ({total_size/1024/1024:.1f} MB)")
+
+    lines.append(f"\n📁 Exported files:")
     for exp in exported_files:
         size_kb = exp['size'] / 1024
-        print(f"  • {exp['contact']}: {os.path.basename(exp['file'])} ({size_kb:.1f} KB, {exp['reactions']} reactions)")
-    
-    print(f"\n🎉 All conversations exported successfully!")
-    print(f"📂 Files are saved in the 'conversations' directory.")
+        lines.append(f"  • {exp['contact']}: {os.path.basename(exp['file'])} ({size_kb:.1f} KB, {exp['reactions']} reactions)")
+
+    lines.append(f"\n🎉 All conversations exported successfully!")
+    lines.append(f"📂 Files are saved in the 'conversations' directory.")
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 if __name__ == "__main__":
@@ -5,6 +5,7 @@ Core WhatsApp Exporter functionality.
 import os
 import sys
 import re
+import functools
 from datetime import datetime
 
 from .database import DatabaseManager
@@ -13,6 +14,74 @@ from .mood_analyzer import MoodAnalyzer
 from .formatter import ConversationFormatter, ForwardInfo
 
 
+# First emoji in a decoded receipt blob, compiled once at import. The base
+# class mirrors the known emoji ranges (modern blocks, misc symbols,
+# dingbats, arrows, stars); the trailing class greedily picks up skin
+# tones, variant selectors, ZWJ sequences and regional indicators.
+_EMOJI_RE = re.compile(
+    '[\U0001F000-\U0001FFFF'   # All modern emoji blocks
+    '☀-⛿'            # Misc symbols
+    '✀-➿'            # Dingbats
+    '⬅-⬇'            # Arrows
+    '⤴⤵'             # Curved arrows
+    '⭐-⭕'            # Stars and circles
+    '〰〽㊗㊙]'  # Wavy dash, marks, circled ideographs
+    '[\U0001F3FB-\U0001F3FF'   # Skin tones
+    '︀-️'            # Variant selectors
+    '‍'                   # Zero-width joiner
+    '\U0001F1E6-\U0001F1FF]*'  # Regional indicators (flags)
+)
+
+# Control bytes stripped from protobuf text fields; used with bytes.translate
+# so the cleanup happens in C before the UTF-8 decode
+_CTRL_BYTES = bytes(range(0x20))
+
+
+class _FilenameTable(dict):
+    """Lazily-populated str.translate table for filename sanitization.
+
+    Keeps word characters, maps whitespace and dashes to underscores and
+    deletes everything else; each codepoint is classified once and cached.
+    """
+
+    def __missing__(self, cp):
+        char = chr(cp)
+        if char.isalnum() or char == '_':
+            mapped = char
+        elif char.isspace() or char == '-':
+            mapped = '_'
+        else:
+            mapped = None
+        self[cp] = mapped
+        return mapped
+
+
+_FILENAME_TABLE = _FilenameTable()
+
+
+@functools.lru_cache(maxsize=None)
+def _format_ts(timestamp):
+    """Return (date_part, time_part) for a Core Data timestamp.
+
+    strftime dominates per-message processing cost; memoizing on the integer
+    second means bursts of messages in the same second format only once.
+    """
+    dt = datetime.fromtimestamp(timestamp + 978307200)
+    return tuple(dt.strftime('%Y-%m-%d %H:%M:%S').split(' '))
+
+
+@functools.lru_cache(maxsize=1)
+def _get_mood_analyzer():
+    """Shared MoodAnalyzer instance.
+
+    Building the analyzer allocates the mood tables and compiles the emoji
+    regex, and the analyzer itself is stateless, so one instance is reused
+    across every exporter - including the reconstructions that happen when
+    a bulk export recovers from an error.
+    """
+    return MoodAnalyzer()
+
+
 class WhatsAppExporter:
     """Main WhatsApp conversation exporter."""
     
@@ -20,7 +89,7 @@ class WhatsAppExporter:
         """Initialize with WhatsApp database."""
         self.db_manager = DatabaseManager(db_path, backup_mode, backup_base_path)
         self.participant_manager = ParticipantManager(self.db_manager)
-        self.mood_analyzer = MoodAnalyzer()
+        self.mood_analyzer = _get_mood_analyzer()
         
         # Media handling setup
         self.media_base_path = self._get_media_base_path(backup_mode, backup_base_path)
@@ -103,31 +172,40 @@ class WhatsAppExporter:
     def get_contacts_with_reactions(self):
         """Get contacts with reactions and their phone numbers."""
         try:
+            # Resolve names in the same query instead of one lookup per JID
             contacts = self.db_manager.fetch_all("""
-                SELECT 
-                    CASE WHEN m.ZISFROMME = 1 THEN m.ZTOJID ELSE m.ZFROMJID END as contact_jid,
-                    COUNT(*) as reaction_count
-                FROM ZWAMESSAGE m
-                JOIN ZWAMESSAGEINFO i ON m.Z_PK = i.ZMESSAGE
-                WHERE m.ZMESSAGETYPE = 0 
-                AND i.ZRECEIPTINFO IS NOT NULL
-                AND LENGTH(i.ZRECEIPTINFO) > 50
-                AND (HEX(i.ZRECEIPTINFO) LIKE '%F09F%' OR HEX(i.ZRECEIPTINFO) LIKE '%E2%')
-                AND (m.ZFROMJID LIKE '%@s.whatsapp.net' OR m.ZTOJID LIKE '%@s.whatsapp.net')
-                GROUP BY contact_jid
-                ORDER BY reaction_count DESC
+                SELECT r.contact_jid, s.ZPARTNERNAME, r.reaction_count
+                FROM (
+                    SELECT
+                        CASE WHEN m.ZISFROMME = 1 THEN m.ZTOJID ELSE m.ZFROMJID END as contact_jid,
+                        COUNT(*) as reaction_count
+                    FROM ZWAMESSAGE m
+                    JOIN ZWAMESSAGEINFO i ON m.Z_PK = i.ZMESSAGE
+                    WHERE m.ZMESSAGETYPE = 0
+                    AND i.ZRECEIPTINFO IS NOT NULL
+                    AND (INSTR(i.ZRECEIPTINFO, X'F09F') > 0 OR INSTR(i.ZRECEIPTINFO, X'E29DA4') > 0)
+                    AND (m.ZFROMJID LIKE '%@s.whatsapp.net' OR m.ZTOJID LIKE '%@s.whatsapp.net')
+                    GROUP BY contact_jid
+                ) r
+                LEFT JOIN ZWACHATSESSION s ON s.ZCONTACTJID = r.contact_jid
+                ORDER BY r.reaction_count DESC
             """)
-            
+
+            from .utils import clean_contact_name, extract_phone_number, format_phone_number
             contact_list = []
-            for jid, count in contacts:
+            for jid, raw_name, count in contacts:
                 if jid:
-                    from .utils import extract_phone_number, format_phone_number
                     phone = extract_phone_number(jid)
                     formatted_phone = format_phone_number(phone) if phone else None
-                    
+
+                    if raw_name:
+                        name = clean_contact_name(raw_name)
+                    else:
+                        name = f"Contact ({jid.split('@')[0]})" if '@' in jid else jid
+
                     contact_list.append({
                         'jid': jid,
-                        'name': self.participant_manager.get_contact_name(jid),
+                        'name': name,
                         'phone': phone,
                         'formatted_phone': formatted_phone,
                         'is_group': jid.endswith('@g.us'),
@@ -139,7 +217,10 @@ class WhatsAppExporter:
             return []
     
     def export_conversation(self, contact_input, backup_mode=None, limit=None, recent=False):
-        """Export a specific conversation."""
+        """Export a specific conversation.
+
+        Returns a (filepath, size_bytes) tuple on success, None on failure.
+        """
         import time
         start_time = time.time()
         try:
@@ -160,27 +241,26 @@ class WhatsAppExporter:
             
             print(f"📋 Found {len(messages)} messages...")
             
-            # Export
+            # Export: stream formatted lines straight to the file instead of
+            # materializing the whole conversation string in memory
             t3 = time.time()
-            formatted_text = self.formatter.format_conversation(messages, target_contact['name'], target_contact['jid'])
-            print(f"⏱️  Format conversation: {time.time() - t3:.2f}s")
-            
-            # Save to file
-            t4 = time.time()
             filename = self._generate_filename(target_contact['name'])
             filepath = os.path.join("conversations", filename)
-            
+
             # Ensure directory exists
             os.makedirs("conversations", exist_ok=True)
-            
+
+            lines = self.formatter.iter_conversation_lines(
+                messages, target_contact['name'], target_contact['jid'])
             with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(formatted_text)
-            print(f"⏱️  Write file: {time.time() - t4:.2f}s")
+                f.writelines(line + '\n' for line in lines)
+            print(f"⏱️  Format + write file: {time.time() - t3:.2f}s")
             
+            size_bytes = os.path.getsize(filepath)
             print(f"✅ Conversation exported to: {filepath}")
-            print(f"📄 File size: {os.path.getsize(filepath)} bytes")
+            print(f"📄 File size: {size_bytes} bytes")
             print(f"⏱️  TOTAL TIME: {time.time() - start_time:.2f}s")
-            return filepath
+            return filepath, size_bytes
             
         except Exception as e:
             import traceback
@@ -244,8 +324,8 @@ class WhatsAppExporter:
         try:
             # Base query for messages - matches the working original code
             t1 = time.time()
-            query = """
-                SELECT 
+            select_block = """
+                SELECT
                     m.Z_PK as message_id,
                     m.ZMESSAGEDATE as message_date,
                     m.ZTEXT as content,
@@ -261,32 +341,49 @@ class WhatsAppExporter:
                     m.ZMEDIAITEM as media_item_id,
                     mi.ZMEDIALOCALPATH as media_local_path,
                     mi.ZTITLE as media_title,
-                    mi.ZFILESIZE as media_file_size
+                    mi.ZFILESIZE as media_file_size,
+                    mi.ZMETADATA as media_metadata,
+                    SUBSTR(p.ZTEXT, 1, 51) as parent_snippet
                 FROM ZWAMESSAGE m
                 LEFT JOIN ZWAMESSAGEINFO i ON m.Z_PK = i.ZMESSAGE
                 LEFT JOIN ZWAMEDIAITEM mi ON m.ZMEDIAITEM = mi.Z_PK
-                WHERE (m.ZFROMJID = ? OR m.ZTOJID = ?)
+                LEFT JOIN ZWAMESSAGE p ON p.Z_PK = m.ZPARENTMESSAGE
+                WHERE {jid_filter}
                 -- Exclude system messages: 6, 10, 15 = empty system notifications (group changes, status updates, etc.)
                 AND m.ZMESSAGETYPE NOT IN (6, 10, 15)
-                ORDER BY m.ZMESSAGEDATE {}
-            """.format("DESC" if recent else "ASC")
-            
-            params = (contact_jid, contact_jid)
+            """
+
+            # The OR over two different columns defeats index selection;
+            # UNION ALL lets SQLite drive each arm from its own (jid, date)
+            # index. The second arm excludes rows the first already matched
+            # so no message appears twice.
+            query = (select_block.format(jid_filter="m.ZFROMJID = ?")
+                     + " UNION ALL "
+                     + select_block.format(jid_filter="(m.ZTOJID = ? AND m.ZFROMJID IS NOT ?)")
+                     + " ORDER BY 2 {}".format("DESC" if recent else "ASC"))
+
+            params = (contact_jid, contact_jid, contact_jid)
             
             if limit:
                 query += f" LIMIT {limit}"
             
-            rows = self.db_manager.fetch_all(query, params)
-            print(f"    ⏱️  SQL query: {time.time() - t1:.2f}s ({len(rows)} rows)")
-            
-            if recent and rows:
-                rows = list(reversed(rows))
-            
-            # Process each message
-            t2 = time.time()
-            for row in rows:
-                self._process_message_row(row, contact_jid)
-            print(f"    ⏱️  Process rows: {time.time() - t2:.2f}s")
+            # Stream rows in chunks instead of materializing them all with
+            # fetchall(); processing starts as soon as the first chunk lands
+            cursor = self.db_manager.execute_query(query, params)
+            row_count = 0
+            while True:
+                chunk = cursor.fetchmany(2000)
+                if not chunk:
+                    break
+                row_count += len(chunk)
+                for row in chunk:
+                    self._process_message_row(row, contact_jid)
+            print(f"    ⏱️  Query + process rows: {time.time() - t1:.2f}s ({row_count} rows)")
+
+            # The recent query returns newest-first; flip back to
+            # chronological order for formatting
+            if recent:
+                self.messages.reverse()
             
             # Post-process messages
             t3 = time.time()
@@ -302,9 +399,12 @@ class WhatsAppExporter:
     def _process_message_row(self, row, contact_jid):
         """Process a single message row."""
         # Convert row to dict - now handles all fields from the query including media
+        date_part, time_part = self._convert_timestamp_parts(row[1])
         message = {
             'message_id': row[0],
-            'date': self._convert_timestamp(row[1]),  # Convert timestamp in Python like original
+            'date': f"{date_part} {time_part}" if date_part else None,
+            'date_part': date_part,
+            'time_part': time_part,
             'content': row[2] or '',
             'is_from_me': bool(row[3]),
             'message_type': row[4],
@@ -360,17 +460,30 @@ class WhatsAppExporter:
         # Extract quoted text from protobuf metadata (100% systematic extraction)
         # Citations can be stored either in the message's media_item or in the parent's media_item
         quoted_text = None
-        
-        # First, try extracting from message's own media_item
+
+        # First, try extracting from message's own media_item - the main query
+        # already joined the media columns, so no extra lookup is needed here
         if message['media_item_id']:
-            quoted_text = self._extract_quoted_text(message['media_item_id'])
-        
+            quoted_text = self._extract_quoted_text(
+                message['media_local_path'], message['media_title'], row[16])
+
         # If no citation found and we have a parent_message_id, check parent's media_item
         if not quoted_text and message['parent_message_id']:
             parent_media_id = self._get_parent_message_media_id(message['parent_message_id'])
             if parent_media_id:
-                quoted_text = self._extract_quoted_text(parent_media_id)
-        
+                quoted_text = self._extract_quoted_text_by_id(parent_media_id)
+
+        # Last resort: the parent's text, self-joined into the main query.
+        # SUBSTR fetched one char past the display limit so we can tell
+        # whether the original text was truncated.
+        if not quoted_text:
+            parent_snippet = row[17]
+            if parent_snippet:
+                if len(parent_snippet) > 50:
+                    quoted_text = parent_snippet[:50] + "..."
+                else:
+                    quoted_text = parent_snippet
+
         # Store the citation if found
         if quoted_text and not isinstance(quoted_text, ForwardInfo):
             message['quoted_text'] = quoted_text
@@ -383,15 +496,14 @@ class WhatsAppExporter:
         
         self.messages.append(message)
     
-    def _convert_timestamp(self, timestamp):
-        """Convert WhatsApp timestamp - matches original logic."""
+    def _convert_timestamp_parts(self, timestamp):
+        """Convert WhatsApp timestamp to (date_part, time_part), memoized."""
         if not timestamp:
-            return None
+            return (None, None)
         try:
-            from datetime import datetime
-            return datetime.fromtimestamp(timestamp + 978307200).strftime('%Y-%m-%d %H:%M:%S')
+            return _format_ts(int(timestamp))
         except Exception:
-            return None
+            return (None, None)
     
     def _decode_varint(self, blob, start_pos):
         """Decode a protobuf varint starting at start_pos. Returns (value, next_pos)."""
@@ -422,108 +534,118 @@ class WhatsAppExporter:
         except Exception:
             return None
     
-    def _extract_quoted_text(self, media_item_id):
-        """Extract quoted text from media metadata - 100% systematic extraction from protobuf."""
+    def _extract_quoted_text_by_id(self, media_item_id):
+        """Extract quoted text from a media item looked up by primary key."""
         try:
-            # First, try to get the media info itself (for media quotes)
             result = self.db_manager.fetch_one(
-                "SELECT ZMEDIALOCALPATH, ZTITLE, ZMESSAGE FROM ZWAMEDIAITEM WHERE Z_PK = ?", 
+                "SELECT ZMEDIALOCALPATH, ZTITLE, ZMETADATA FROM ZWAMEDIAITEM WHERE Z_PK = ?",
                 (media_item_id,)
             )
-            
-            if result and result[0]:  # Has media path
-                media_path = result[0]
-                media_title = result[1]
-                
+            if not result:
+                return None
+            return self._extract_quoted_text(result[0], result[1], result[2])
+        except Exception:
+            return None
+
+    def _extract_quoted_text(self, media_path, media_title, metadata_blob):
+        """Extract quoted text from media metadata - 100% systematic extraction from protobuf.
+
+        Works directly on the media columns already fetched by the main
+        conversation query, so no per-message lookup is needed.
+        """
+        try:
+            if media_path:  # Has media path - describe the media itself
                 # Get media type from path extension
-                if media_path:
-                    ext = os.path.splitext(media_path)[1].lower()
-                    if ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
-                        media_type = "Image"
-                    elif ext in ['.mp4', '.mov', '.avi']:
-                        media_type = "Video"
-                    elif ext in ['.mp3', '.wav', '.m4a']:
-                        media_type = "Audio"
-                    else:
-                        media_type = "Media"
-                    
-                    # If there's a title/comment with the media, include it
-                    if media_title and media_title.strip():
-                        return f"[{media_type}] {media_title.strip()}"
-                    else:
-                        return f"[{media_type}]"
-            
+                ext = os.path.splitext(media_path)[1].lower()
+                if ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
+                    media_type = "Image"
+                elif ext in ['.mp4', '.mov', '.avi']:
+                    media_type = "Video"
+                elif ext in ['.mp3', '.wav', '.m4a']:
+                    media_type = "Audio"
+                else:
+                    media_type = "Media"
+
+                # If there's a title/comment with the media, include it
+                if media_title and media_title.strip():
+                    return f"[{media_type}] {media_title.strip()}"
+                else:
+                    return f"[{media_type}]"
+
             # If no direct media info, try to extract from metadata blob
-            result = self.db_manager.fetch_one(
-                "SELECT ZMETADATA FROM ZWAMEDIAITEM WHERE Z_PK = ?", 
-                (media_item_id,)
-            )
-            if not result or not result[0]:
+            if not metadata_blob:
                 return None
 
-            blob = result[0]
-            
+            blob = metadata_blob
+
             # Try to find tag 1 specifically (most reliable citation tag)
-            # Tag 1 with wire type 2 = 0x0a
-            i = 0
-            while i < len(blob) - 3:
-                if blob[i] == 0x0a and (blob[i] & 0x7) == 2:  # Tag 1, wire type 2
-                    # Decode the length
-                    length_byte = blob[i + 1]
-                    if length_byte < 128:
-                        length = length_byte
-                        data_start = i + 2
-                    else:
-                        # Multi-byte varint
-                        length, data_start = self._decode_varint(blob, i + 1)
-                    
-                    if data_start + length <= len(blob) and length > 10:
-                        try:
-                            text = blob[data_start:data_start + length].decode('utf-8', errors='ignore').strip()
-                            text = re.sub(r'[\x00-\x1f]+', '', text)
-                            
-                            if len(text) > 3:
-                                # Check for forward hash
-                                sanitized = re.sub(r"[^A-Za-z0-9'`{}]", "", text)
-                                if (len(sanitized) > 10 and 
-                                    re.fullmatch(r"[A-Za-z0-9]{2,24}['`][A-Za-z0-9{}]{2,48}", sanitized) and
-                                    any(c.isdigit() or c in '{}' or (c.isalpha() and c.isupper()) for c in sanitized)):
-                                    from .formatter import ForwardInfo
-                                    return ForwardInfo(sanitized)
-                                
-                                # Valid quote found
-                                if len(text) > 50:
-                                    words = text[:50].split()
-                                    text = ' '.join(words[:-1]) + "..." if len(words) > 1 else text[:50] + "..."
-                                return text
-                        except:
-                            pass
-                i += 1
-            
-            # Fallback: look for other tags (0, 2, 3, 4) if tag 1 not found
+            # Tag 1 with wire type 2 = 0x0a; jump between candidate bytes
+            # with find() instead of stepping through the blob in Python
+            blob_len = len(blob)
+            pos = 0
+            while True:
+                pos = blob.find(b'\x0a', pos)
+                if pos == -1 or pos >= blob_len - 3:
+                    break
+                # Decode the length
+                length_byte = blob[pos + 1]
+                if length_byte < 128:
+                    length = length_byte
+                    data_start = pos + 2
+                else:
+                    # Multi-byte varint
+                    length, data_start = self._decode_varint(blob, pos + 1)
+
+                if data_start + length <= blob_len and length > 10:
+                    try:
+                        raw = blob[data_start:data_start + length].translate(None, _CTRL_BYTES)
+                        text = raw.decode('utf-8', errors='ignore').strip()
+
+                        if len(text) > 3:
+                            # Check for forward hash
+                            sanitized = re.sub(r"[^A-Za-z0-9'`{}]", "", text)
+                            if (len(sanitized) > 10 and
+                                re.fullmatch(r"[A-Za-z0-9]{2,24}['`][A-Za-z0-9{}]{2,48}", sanitized) and
+                                any(c.isdigit() or c in '{}' or (c.isalpha() and c.isupper()) for c in sanitized)):
+                                from .formatter import ForwardInfo
+                                return ForwardInfo(sanitized)
+
+                            # Valid quote found
+                            if len(text) > 50:
+                                words = text[:50].split()
+                                text = ' '.join(words[:-1]) + "..." if len(words) > 1 else text[:50] + "..."
+                            return text
+                    except:
+                        pass
+                pos += 1
+            
+            # Fallback: look for other tags (0, 2, 3, 4) if tag 1 not found.
+            # Only the first plausible field is kept, so stop scanning as
+            # soon as one is found instead of walking the rest of the blob
             i = 0
             best_match = None
             while i < len(blob) - 2:
                 tag_byte = blob[i]
                 if (tag_byte & 0x7) == 2:  # Length-delimited field
                     tag = tag_byte >> 3
-                    
+
                     if tag <= 4 and tag != 1:  # Skip tag 1 (already checked above)
                         length_byte = blob[i + 1]
                         if length_byte < 128:
                             length = length_byte
                             data_start = i + 2
-                            
+
                             if data_start + length <= len(blob) and 10 < length < 500:
                                 try:
-                                    text = blob[data_start:data_start + length].decode('utf-8', errors='ignore').strip()
-                                    text = re.sub(r'[\x00-\x1f]+', '', text)
-                                    
-                                    if len(text) > 3 and not best_match:
+                                    raw = blob[data_start:data_start + length].translate(None, _CTRL_BYTES)
+                                    text = raw.decode('utf-8', errors='ignore').strip()
+
+                                    if len(text) > 3:
                                         best_match = text
+                                        break
                                 except:
                                     pass
-                            
+
                             i += data_start + length
                             continue
                 i += 1
@@ -633,46 +755,23 @@ class WhatsAppExporter:
             blob = receipt_info if isinstance(receipt_info, bytes) else None
             if not blob:
                 return None
-            
+
+            # Fast reject: every emoji the regex can match encodes with one
+            # of these lead bytes (F0 9F for the U+1Fxxx planes, E2/E3 for
+            # the BMP symbol ranges). Most receipts carry no emoji at all,
+            # so this C-level scan skips the decode for them entirely.
+            if (b'\xf0\x9f' not in blob and b'\xe2' not in blob
+                    and b'\xe3' not in blob):
+                return None
+
             # Try to decode the whole blob as UTF-8 (ignoring errors)
             # Then find emoji characters within it
             decoded_blob = blob.decode('utf-8', errors='ignore')
             
-            emoji = None
-            # Look for emoji characters (skip ASCII and common control chars)
-            i = 0
-            while i < len(decoded_blob):
-                char = decoded_blob[i]
-                cp = ord(char)
-                # Check if it's in known emoji ranges (precise ranges to avoid math symbols)
-                if (0x1F000 <= cp <= 0x1FFFF or      # All modern emoji blocks
-                    0x2600 <= cp <= 0x26FF or         # Misc symbols (☀️ ☁️ ⚡ etc)
-                    0x2700 <= cp <= 0x27BF or         # Dingbats (✂️ ✈️ ✉️ ✏️ ✒️ ✔️ ✖️ ✨ ✳️ ✴️ ❄️ ❇️ ❌ ❎ ❓ ❔ ❕ ❗ ❤️ ➕ ➖ ➗ ➡️ ➰ etc)
-                    0x2B05 <= cp <= 0x2B07 or         # Arrows (⬅️ ⬆️ ⬇️)
-                    0x2934 <= cp <= 0x2935 or         # Curved arrows
-                    0x2B50 <= cp <= 0x2B55 or         # Stars and circles (⭐ ⭕)
-                    0x3030 == cp or                   # Wavy dash
-                    0x303D == cp or                   # Part alternation mark
-                    0x3297 == cp or                   # Circled ideograph
-                    0x3299 == cp):                    # Circled ideograph
-                    emoji = char
-                    # Check for modifiers/variant selectors following
-                    j = i + 1
-                    while j < len(decoded_blob):
-                        next_char = decoded_blob[j]
-                        next_cp = ord(next_char)
-                        # Skin tone (1F3FB-1F3FF) or variant selector (FE00-FE0F) or ZWJ (200D)
-                        if (0x1F3FB <= next_cp <= 0x1F3FF or
-                            0xFE00 <= next_cp <= 0xFE0F or
-                            next_cp == 0x200D or
-                            0x1F1E6 <= next_cp <= 0x1F1FF):  # Regional indicators (flags)
-                            emoji += next_char
-                            j += 1
-                        else:
-                            break
-                    break
-                i += 1
-            
+            # One precompiled regex search instead of a per-character range scan
+            match = _EMOJI_RE.search(decoded_blob)
+            emoji = match.group(0) if match else None
+
             if not emoji:
                 return None
             
@@ -791,39 +890,25 @@ class WhatsAppExporter:
             message['is_forwarded'] = True
     
     def _post_process_messages(self, contact_jid):
-        """Post-process messages for citations and forwards."""
+        """Post-process messages for citations and forwards.
+
+        Parent-message quotes are resolved by the SQL self-join in the main
+        query, so the only remaining pass is the metadata-based citation
+        lookup.
+        """
         import time
-        # Create message lookup for parent references
+        # Resolve citations via media metadata (DETERMINISTIC lookup by ZSTANZAID)
         t1 = time.time()
-        message_lookup = {msg['message_id']: msg for msg in self.messages}
-        print(f"      ⏱️  Message lookup: {time.time() - t1:.2f}s")
-        
-        # Step 1: Resolve parent message quotes (like the original code)
-        t2 = time.time()
-        parent_quote_count = 0
-        for message in self.messages:
-            if (not message.get('quoted_text') and message.get('parent_message_id') 
-                and message['parent_message_id'] in message_lookup):
-                parent_msg = message_lookup[message['parent_message_id']]
-                quoted_content = parent_msg['content'][:50] if parent_msg.get('content') else ''
-                if len(parent_msg.get('content', '')) > 50:
-                    quoted_content += "..."
-                message['quoted_text'] = quoted_content
-                parent_quote_count += 1
-        print(f"      ⏱️  Resolve parent quotes: {time.time() - t2:.2f}s ({parent_quote_count} found via parent_id)")
-        
-        # Step 2: Resolve citations via media metadata (DETERMINISTIC lookup by ZSTANZAID)
-        t3 = time.time()
-        reply_targets = [m for m in self.messages 
+        reply_targets = [m for m in self.messages
                         if not m.get('quoted_text') and not m.get('parent_message_id') and m.get('media_item_id')]
-        
+
         print(f"      🔍 Deterministic lookup: {len(reply_targets)} candidates (no quoted_text, no parent_id, but has media_item_id)")
-        
-        metadata_count = self._resolve_citations_from_metadata(reply_targets, message_lookup)
-        print(f"      ⏱️  Resolve via metadata: {time.time() - t3:.2f}s ({metadata_count} found via ZSTANZAID lookup)")
 
-    
-    def _resolve_citations_from_metadata(self, targets, message_lookup):
+        metadata_count = self._resolve_citations_from_metadata(reply_targets)
+        print(f"      ⏱️  Resolve via metadata: {time.time() - t1:.2f}s ({metadata_count} found via ZSTANZAID lookup)")
+
+
+    def _resolve_citations_from_metadata(self, targets):
         """Resolve citations by extracting ZSTANZAID from ZMETADATA and looking up the parent message.
         This is a DETERMINISTIC approach (no heuristic matching)."""
         if not targets:
@@ -916,10 +1001,9 @@ class WhatsAppExporter:
     
     def _generate_filename(self, contact_name):
         """Generate safe filename for export."""
-        # Clean up contact name for filename
-        safe_name = re.sub(r'[^\w\s-]', '', contact_name)
-        safe_name = re.sub(r'[-\s]+', '_', safe_name)
-        safe_name = safe_name.strip('_')
+        # Clean up contact name for filename - one translate pass over a
+        # cached table instead of two regex substitutions
+        safe_name = contact_name.translate(_FILENAME_TABLE).strip('_')
         
         # Add timestamp
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -76,12 +76,22 @@ class ConversationFormatter:
         return f" [{reaction_emoji}]"
     
     def format_conversation(self, messages, contact_name, contact_jid=None):
-        """Format conversation for export."""
+        """Format conversation for export as a single string."""
+        return "\n".join(self.iter_conversation_lines(messages, contact_name, contact_jid))
+
+    def iter_conversation_lines(self, messages, contact_name, contact_jid=None):
+        """Yield conversation lines one at a time.
+
+        Streaming callers write each line as it is produced instead of
+        holding the whole formatted conversation in memory next to the
+        message list.
+        """
         import time
         start_time = time.time()
         if not messages:
-            return "No messages found."
-        
+            yield "No messages found."
+            return
+
         output = []
         output.append("=" * 80)
         output.append(f"WhatsApp Conversation Export")
@@ -89,7 +99,7 @@ class ConversationFormatter:
         output.append(f"Messages: {len(messages)}")
         output.append(f"Date Range: {messages[0]['date']} to {messages[-1]['date']}")
         output.append(f"Exported: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        
+
         # Add mood timeline analysis
         t1 = time.time()
         mood_analysis = self.mood_analyzer.analyze_mood_timeline(messages)
@@ -149,63 +159,60 @@ class ConversationFormatter:
         
         output.append("=" * 80)
         output.append("")
-        
+
+        yield from output
+
         # Format messages
         t3 = time.time()
-        self._format_messages(output, messages, contact_name)
+        yield from self._format_messages(messages, contact_name)
         print(f"    ⏱️  Format messages: {time.time() - t3:.2f}s")
         print(f"    ⏱️  Format TOTAL: {time.time() - start_time:.2f}s")
-        
+
         # Stats
-        output.append("")
-        output.append("=" * 80)
-        output.append(f"📊 Total messages: {len(messages)}")
-        output.append("=" * 80)
-        
-        return "\n".join(output)
-    
-    def _format_messages(self, output, messages, contact_name):
-        """Format the actual message content."""
+        yield ""
+        yield "=" * 80
+        yield f"📊 Total messages: {len(messages)}"
+        yield "=" * 80
+
+    def _format_messages(self, messages, contact_name):
+        """Yield the formatted message content line by line."""
         import time
         current_date = None
         slow_messages = []
         for i, msg in enumerate(messages):
             msg_start = time.time()
-            message_date = msg['date']
-            if not message_date:
+            if not msg['date']:
                 continue
-                
-            # Date separator
-            try:
-                msg_date_part = message_date.split(' ')[0]
-                if current_date != msg_date_part:
-                    current_date = msg_date_part
-                    output.append(f"\n--- {current_date} ---\n")
-            except:
-                pass
-            
+
+            # Date separator - the date/time parts were split once when the
+            # message was built, no need to re-split (or catch) here
+            msg_date_part = msg['date_part']
+            if current_date != msg_date_part:
+                current_date = msg_date_part
+                yield f"\n--- {current_date} ---\n"
+
             # Time and sender
-            try:
-                time_part = message_date.split(' ')[1]
-            except:
-                time_part = "??:??"
-            
+            time_part = msg['time_part'] or "??:??"
+
             prefix = ">>" if msg['is_from_me'] else "<"
-            
+
             # Remove indentation for better readability - all messages aligned to left
             indent = ""
-            
+
             # For group messages, add sender name
             sender_prefix = ""
             if msg.get('sender_name') and not msg['is_from_me']:
                 sender_prefix = f"{msg['sender_name']}: "
-            
-            # Handle quoted messages
+
+            # Handle quoted messages; the helpers fill a small per-message
+            # list that is flushed immediately
+            out = []
             if msg.get('quoted_text'):
-                self._format_quoted_message(output, msg, time_part, prefix, indent, sender_prefix, contact_name)
+                self._format_quoted_message(out, msg, time_part, prefix, indent, sender_prefix, contact_name)
             else:
-                self._format_regular_message(output, msg, time_part, prefix, indent, sender_prefix, contact_name)
-            
+                self._format_regular_message(out, msg, time_part, prefix, indent, sender_prefix, contact_name)
+            yield from out
+
             # Track slow messages
             msg_time = time.time() - msg_start
             if msg_time > 0.01:  # More than 10ms
@@ -3,6 +3,7 @@ Mood analysis and timeline generation for WhatsApp conversations.
 """
 
 import re
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 
 
@@ -150,8 +151,10 @@ class MoodAnalyzer:
                             individual_reactions = reaction_content.split(';')
                             
                             for reaction_item in individual_reactions:
-                                if ':' in reaction_item:
-                                    person, emoji = reaction_item.split(':', 1)
+                                # partition scans once and allocates no list,
+                                # unlike the ':' in-check followed by split
+                                person, sep, emoji = reaction_item.partition(':')
+                                if sep:
                                     mood = self.mood_categories.get(emoji, 'unknown')
                                     if mood != 'unknown':
                                         reactions_timeline.append({
@@ -249,10 +252,11 @@ class MoodAnalyzer:
             end_sunday = end_date + timedelta(days=(6 - end_date.weekday()))
             end_sunday = end_sunday.replace(hour=23, minute=59, second=59, microsecond=999999)
             
-            # Create weekly buckets
-            weekly_moods = {}
-            weekly_activity = {}
-            
+            # Create weekly buckets; Counter tallies in C so the missing-key
+            # initialization dance disappears
+            weekly_moods = defaultdict(Counter)
+            weekly_activity = Counter()
+
             # First, mark weeks with any conversation activity
             for msg in messages:
                 try:
@@ -260,13 +264,11 @@ class MoodAnalyzer:
                     week_start = msg_date - timedelta(days=msg_date.weekday())
                     week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
                     week_key = week_start.strftime('%Y-%m-%d')
-                    
-                    if week_key not in weekly_activity:
-                        weekly_activity[week_key] = 0
+
                     weekly_activity[week_key] += 1
                 except Exception:
                     continue
-            
+
             # Then, analyze mood for weeks with reactions
             for reaction in reactions_timeline:
                 try:
@@ -274,14 +276,8 @@ class MoodAnalyzer:
                     week_start = reaction_date - timedelta(days=reaction_date.weekday())
                     week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
                     week_key = week_start.strftime('%Y-%m-%d')
-                    
-                    if week_key not in weekly_moods:
-                        weekly_moods[week_key] = {}
-                    
-                    mood = reaction['mood']
-                    if mood not in weekly_moods[week_key]:
-                        weekly_moods[week_key][mood] = 0
-                    weekly_moods[week_key][mood] += 1
+
+                    weekly_moods[week_key][reaction['mood']] += 1
                 except Exception:
                     continue
             
@@ -308,7 +304,7 @@ class MoodAnalyzer:
                 # Determine character for this week
                 if week_key in weekly_moods and weekly_moods[week_key]:
                     # Week has reactions - find dominant mood
-                    dominant_mood = max(weekly_moods[week_key].items(), key=lambda x: x[1])[0]
+                    dominant_mood = weekly_moods[week_key].most_common(1)[0][0]
                     mood_emoji = self._get_mood_emoji(dominant_mood)
                     year_chars.append(mood_emoji)
                 elif week_key in weekly_activity and weekly_activity[week_key] > 0:
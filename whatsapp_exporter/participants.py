@@ -13,6 +13,23 @@ class ParticipantManager:
         self.db_manager = db_manager
         self.contact_cache = {}
         self._my_jid_cache = None  # Cache for "my" JID
+        self._cache_preloaded = False
+        self._preload_contact_cache()
+
+    def _preload_contact_cache(self):
+        """Load every contact name in one query instead of one query per JID."""
+        try:
+            rows = self.db_manager.fetch_all("""
+                SELECT ZCONTACTJID, ZPARTNERNAME
+                FROM ZWACHATSESSION
+                WHERE ZCONTACTJID IS NOT NULL
+            """)
+            for jid, name in rows:
+                if name:
+                    self.contact_cache[jid] = clean_contact_name(name)
+            self._cache_preloaded = True
+        except Exception as e:
+            print(f"⚠️ Error preloading contact names: {e}")
     
     def _get_my_jid(self):
         """Get the JID of the database owner (the person running the export)."""
@@ -42,18 +59,25 @@ class ParticipantManager:
         """Get contact name from JID, with caching."""
         if jid in self.contact_cache:
             return self.contact_cache[jid]
-        
+
+        # With the preloaded cache a missing JID is simply unknown - no
+        # point running the per-JID query again
+        if self._cache_preloaded:
+            name = f"Contact ({jid.split('@')[0]})" if '@' in jid else jid
+            self.contact_cache[jid] = name
+            return name
+
         try:
             result = self.db_manager.fetch_one(
-                "SELECT ZPARTNERNAME FROM ZWACHATSESSION WHERE ZCONTACTJID = ?", 
+                "SELECT ZPARTNERNAME FROM ZWACHATSESSION WHERE ZCONTACTJID = ?",
                 (jid,)
             )
-            
+
             if result and result[0]:
                 name = clean_contact_name(result[0])
             else:
                 name = f"Contact ({jid.split('@')[0]})" if '@' in jid else jid
-            
+
             self.contact_cache[jid] = name
             return name
         except Exception as e: